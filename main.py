@@ -136,9 +136,11 @@ from services.catalog_service import (
     set_catalog_barcode_if_absent,
     should_fetch_catalog,
     spapi_catalog_status,
+    spapi_catalog_status_for,
     update_catalog_barcode,
     upsert_spapi_catalog,
 )
+from services.db import deferred_wal_checkpoint, write_transaction
 from services.df_payments import (
     start_df_payments_incremental_scheduler,
     stop_df_payments_incremental_scheduler,
@@ -180,6 +182,8 @@ from services.vendor_po_store import (
     get_vendor_po_ledger,
     get_vendor_po_line_amount_total,
     get_vendor_po_line_totals_for_po,
+    get_vendor_po_lines_for_pos,
+    get_vendor_po_lines_with_totals,
     get_vendor_po_list,
     get_vendor_po_sync_state,
     get_vendor_pos_by_numbers,
@@ -438,8 +442,19 @@ CATALOG_API_HOST = os.getenv("CATALOG_API_HOST", "https://sellingpartnerapi-na.a
 
 # Marketplace region mappings for SP-API endpoints
 # UAE (A2VIGQ35RCS4UG) belongs to EU region along with DE, ES, and UK marketplaces
-EU_MARKETPLACE_IDS = {"A2VIGQ35RCS4UG", "A1PA6795UKMFR9", "A13V1IB3VIYZZH", "A1RKKUPIHCS9HS", "A1F83G8C2ARO7P"}
-FE_MARKETPLACE_IDS = {"A1VC38T7YXB528"}  # JP
+# Frozen so the precomputed _SPAPI_HOST_BY_MARKETPLACE table below cannot drift from them
+EU_MARKETPLACE_IDS = frozenset(
+    {"A2VIGQ35RCS4UG", "A1PA6795UKMFR9", "A13V1IB3VIYZZH", "A1RKKUPIHCS9HS", "A1F83G8C2ARO7P"}
+)
+FE_MARKETPLACE_IDS = frozenset({"A1VC38T7YXB528"})  # JP
+SPAPI_HOST_NA = "https://sellingpartnerapi-na.amazon.com"
+SPAPI_HOST_EU = "https://sellingpartnerapi-eu.amazon.com"
+SPAPI_HOST_FE = "https://sellingpartnerapi-fe.amazon.com"
+# marketplace_id -> SP-API host; anything not listed is NA
+_SPAPI_HOST_BY_MARKETPLACE = {
+    **{mp: SPAPI_HOST_EU for mp in EU_MARKETPLACE_IDS},
+    **{mp: SPAPI_HOST_FE for mp in FE_MARKETPLACE_IDS},
+}
 PO_TRACKER_PATH = Path(__file__).parent / "po_tracker.json"
 OOS_STATE_PATH = Path(__file__).parent / "oos_state.json"
 CATALOG_FETCHER_EXCLUSIONS_PATH = Path(__file__).parent / "catalog_fetcher_exclusions.json"
@@ -1061,7 +1076,7 @@ def fetch_spapi_catalog_item(asin: str) -> Dict[str, Any]:
     """
     if not asin:
         raise HTTPException(status_code=400, detail="Missing ASIN")
-    existing = spapi_catalog_status().get(asin)
+    existing = spapi_catalog_status_for([asin]).get(asin)
     if existing:
         return {"asin": asin, "source": "db", "title": existing.get("title"), "image": existing.get("image")}
 
@@ -1229,11 +1244,7 @@ async def catalog_cache_stats():
 
 
 def resolve_vendor_host(marketplace_id: str) -> str:
-    if marketplace_id in EU_MARKETPLACE_IDS:
-        return "https://sellingpartnerapi-eu.amazon.com"
-    if marketplace_id in FE_MARKETPLACE_IDS:
-        return "https://sellingpartnerapi-fe.amazon.com"
-    return "https://sellingpartnerapi-na.amazon.com"
+    return _SPAPI_HOST_BY_MARKETPLACE.get(marketplace_id, SPAPI_HOST_NA)
 
 
 class PoStatusUpdate(BaseModel):
@@ -1422,7 +1433,7 @@ def fetch_vendor_pos_from_api(created_after: str, created_before: str, max_pages
 
 def _parse_qty(val: Any) -> int:
     try:
-        if isinstance(val, dict):
+        if type(val) is dict:
             return int(val.get("amount") or 0)
         return int(val or 0)
     except Exception:
@@ -1695,7 +1706,7 @@ def consolidate_picklist(po_numbers: List[str]) -> Dict[str, Any]:
         selected_pos,
         load_oos_state,
         save_oos_state,
-        spapi_catalog_status,
+        spapi_catalog_status_for,
         oos_service.upsert_oos_entry,
         get_rejected_vendor_po_lines,
     )
@@ -1712,11 +1723,21 @@ def _hydrate_picklist_po_details(po_records: List[Dict[str, Any]]) -> None:
     if not po_records:
         return
 
+    # Fetch lines for every PO that needs them in one query instead of one per PO.
+    missing = [
+        (po.get("purchaseOrderNumber") or "").strip()
+        for po in po_records
+        if not (po.get("orderDetails") or {}).get("items")
+    ]
+    lines_by_po = get_vendor_po_lines_for_pos(missing) if missing else {}
     for po in po_records:
-        _hydrate_po_with_db_lines(po)
+        po_number = (po.get("purchaseOrderNumber") or "").strip()
+        _hydrate_po_with_db_lines(po, lines_by_po.get(po_number, []))
 
 
-def _hydrate_po_with_db_lines(po: Dict[str, Any]) -> Tuple[bool, int]:
+def _hydrate_po_with_db_lines(
+    po: Dict[str, Any], rows: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[bool, int]:
     details = po.get("orderDetails") or {}
     items = details.get("items") or []
     if items:
@@ -1726,7 +1747,8 @@ def _hydrate_po_with_db_lines(po: Dict[str, Any]) -> Tuple[bool, int]:
     if not po_number:
         return False, 0
 
-    rows = store_get_vendor_po_lines(po_number) or []
+    if rows is None:
+        rows = store_get_vendor_po_lines(po_number) or []
     normalized_items: List[Dict[str, Any]] = []
     for idx, row in enumerate(rows, start=1):
         asin = (row.get("asin") or row.get("vendor_sku") or row.get("external_id") or "").strip()
@@ -2478,14 +2500,14 @@ async def get_single_vendor_po(po_number: str, enrich: int = 0):
         except Exception as exc:
             logger.warning(f"[VendorPO] Refresh on open failed for {po_number}: {exc}")
 
-    used_db_lines, _ = _hydrate_po_with_db_lines(po)
-
+    db_lines: Optional[List[Dict[str, Any]]] = None
     line_totals: Dict[str, Any] = {}
     try:
-        line_totals = get_vendor_po_line_totals_for_po(po_number)
+        db_lines, line_totals = get_vendor_po_lines_with_totals(po_number)
     except Exception as exc:
-        logger.warning(f"[VendorPO] Failed to load DB totals for PO {po_number}: {exc}")
-        line_totals = {}
+        logger.warning(f"[VendorPO] Failed to load DB lines/totals for PO {po_number}: {exc}")
+        db_lines, line_totals = None, {}
+    used_db_lines, _ = _hydrate_po_with_db_lines(po, db_lines)
     # Ensure detail exists for modal display
     if not po.get("orderDetails", {}).get("items"):
         try:
@@ -3541,11 +3563,13 @@ def get_oos_items():
     Return consolidated Out-of-Stock items (one per ASIN) for the OOS tab.
     Includes export_status field indicating if ASIN was previously exported.
     """
-    from services.db import is_asin_exported
-    
+    from services.db import get_exported_asins
+
     state = load_oos_state()
     items = list(state.values())
     catalog = spapi_catalog_status()
+    # One query for the export history instead of one lookup per ASIN
+    exported_asins = get_exported_asins()
 
     agg: Dict[str, Dict[str, Any]] = {}
     for it in items:
@@ -3581,7 +3605,7 @@ def get_oos_items():
     for asin, entry in agg.items():
         entry["poNumbers"] = sorted(list(entry.get("poNumbers") or []))
         # Set export_status based on export history
-        entry["export_status"] = "exported" if is_asin_exported(asin) else "pending"
+        entry["export_status"] = "exported" if asin in exported_asins else "pending"
         consolidated.append(entry)
 
     return {"items": consolidated}
@@ -3596,10 +3620,11 @@ def export_oos_items():
     """
     import uuid
 
-    from services.db import is_asin_exported, mark_oos_asins_exported
-    
+    from services.db import get_exported_asins, mark_oos_asins_exported
+
     state = load_oos_state()
     items = list(state.values())
+    exported_asins = get_exported_asins()
     pending_asins: list[str] = []
     
     for it in items:
@@ -3614,7 +3639,7 @@ def export_oos_items():
         if qty_val <= 0:
             continue
         # Only include pending ASINs (not yet exported)
-        if not is_asin_exported(asin):
+        if asin not in exported_asins:
             pending_asins.append(asin)
 
     # Generate export batch ID
@@ -3963,7 +3988,7 @@ def fetch_catalog_for_asin(asin: str, background_tasks: BackgroundTasks):
     """
     has_data = False
     try:
-        fetched = spapi_catalog_status().get(asin)
+        fetched = spapi_catalog_status_for([asin]).get(asin)
         if fetched and (fetched.get("title") or fetched.get("image")):
             return {"asin": asin, "status": "cached", "title": fetched.get("title"), "image": fetched.get("image")}
         has_data = bool(fetched and (fetched.get("title") or fetched.get("image")))
@@ -4017,7 +4042,7 @@ def fetch_catalog_for_missing(background_tasks: BackgroundTasks):
     """
     try:
         asins, _ = extract_asins_from_pos()
-        fetched = spapi_catalog_status()
+        fetched = spapi_catalog_status_for(asins)
         missing = [a for a in asins if a not in fetched]
     except Exception as exc:
         logger.error(f"[Catalog] Error listing missing ASINs: {exc}")
@@ -4070,7 +4095,7 @@ def update_catalog_barcode_endpoint(payload: Dict[str, Any]):
         raise HTTPException(status_code=400, detail="Invalid barcode. Expect 12-digit UPC or 13-digit EAN numeric value.")
     if not update_catalog_barcode(asin, normalized):
         raise HTTPException(status_code=404, detail="Catalog item not found")
-    item = spapi_catalog_status().get(asin) or {}
+    item = spapi_catalog_status_for([asin]).get(asin) or {}
     item["barcode"] = normalized
     return {"status": "ok", "asin": asin, "barcode": normalized, "item": item}
 
@@ -4500,46 +4525,26 @@ def _sync_vendor_po_lines_for_po(po_number: str):
             sku = item.get("vendorProductIdentifier", "")
 
             if use_item_status:
-                ordered_qty = 0
-                oq_wrapper = item.get("orderedQuantity", {})
-                if isinstance(oq_wrapper, dict):
-                    oq_inner = oq_wrapper.get("orderedQuantity", {})
-                    if isinstance(oq_inner, dict):
-                        ordered_qty = int(oq_inner.get("amount", 0) or 0)
-
-                cancelled_qty = 0
-                if isinstance(oq_wrapper, dict):
-                    can_inner = oq_wrapper.get("cancelledQuantity", {})
-                    if isinstance(can_inner, dict):
-                        cancelled_qty = int(can_inner.get("amount", 0) or 0)
-
-                accepted_qty = 0
-                ack_obj = item.get("acknowledgementStatus", {})
-                if isinstance(ack_obj, dict):
-                    acc_qty = ack_obj.get("acceptedQuantity", {})
-                    rej_qty = ack_obj.get("rejectedQuantity", {})
-                    if isinstance(acc_qty, dict):
-                        accepted_qty = int(acc_qty.get("amount", 0) or 0)
-                    if isinstance(rej_qty, dict):
-                        cancelled_qty += int(rej_qty.get("amount", 0) or 0)
-
-                received_qty = 0
-                pending_qty = 0
-                recv_obj = item.get("receivingStatus", {}) or {}
-                if isinstance(recv_obj, dict):
-                    recv_qty = recv_obj.get("receivedQuantity", {})
-                    if isinstance(recv_qty, dict):
-                        received_qty = int(recv_qty.get("amount", 0) or 0)
-                    pending_obj = recv_obj.get("pendingQuantity", {})
-                    if isinstance(pending_obj, dict):
-                        pending_qty = int(pending_obj.get("amount", 0) or 0)
+                oq_wrapper = item.get("orderedQuantity")
+                if type(oq_wrapper) is not dict:
+                    oq_wrapper = {}
+                ack_obj = item.get("acknowledgementStatus")
+                if type(ack_obj) is not dict:
+                    ack_obj = {}
+                recv_obj = item.get("receivingStatus")
+                if type(recv_obj) is not dict:
+                    recv_obj = {}
+
+                ordered_qty = _parse_qty(oq_wrapper.get("orderedQuantity"))
+                cancelled_qty = _parse_qty(oq_wrapper.get("cancelledQuantity"))
+                accepted_qty = _parse_qty(ack_obj.get("acceptedQuantity"))
+                cancelled_qty += _parse_qty(ack_obj.get("rejectedQuantity"))
+                received_qty = _parse_qty(recv_obj.get("receivedQuantity"))
+                pending_qty = _parse_qty(recv_obj.get("pendingQuantity"))
                 if pending_qty == 0:
                     pending_qty = max(0, accepted_qty - received_qty)
             else:
-                ordered_qty = 0
-                oq = item.get("orderedQuantity", {})
-                if isinstance(oq, dict):
-                    ordered_qty = int(oq.get("amount", 0) or 0)
+                ordered_qty = _parse_qty(item.get("orderedQuantity"))
                 cancelled_qty = 0
                 accepted_qty = ordered_qty
                 received_qty = 0
@@ -4624,21 +4629,26 @@ def _sync_vendor_po_lines_for_po(po_number: str):
             logger.error(f"[VendorPO] Error processing item {item_seq} in PO {po_number}: {e}", exc_info=True)
             continue
 
-    replace_vendor_po_lines(po_number, line_payloads)
-    update_header_totals_from_lines(
-        po_number,
-        totals,
-        last_changed_at=detailed_po.get("lastUpdatedDate"),
-        total_cost=float(total_cost),
-        cost_currency=cost_currency,
-    )
-    update_header_raw_payload(
-        po_number,
-        detailed_po,
-        source="line_sync",
-        source_detail="detail_refresh",
-        synced_at=now_utc,
-    )
+    # Lines and both header updates share one transaction: one commit per PO instead of
+    # three, and the header never shows totals for a line set that was not written.
+    with write_transaction() as conn:
+        replace_vendor_po_lines(po_number, line_payloads, conn=conn)
+        update_header_totals_from_lines(
+            po_number,
+            totals,
+            last_changed_at=detailed_po.get("lastUpdatedDate"),
+            total_cost=float(total_cost),
+            cost_currency=cost_currency,
+            conn=conn,
+        )
+        update_header_raw_payload(
+            po_number,
+            detailed_po,
+            source="line_sync",
+            source_detail="detail_refresh",
+            synced_at=now_utc,
+            conn=conn,
+        )
     logger.info(f"[VendorPO] Synced {len(line_payloads)} lines for PO {po_number}")
 
 
@@ -4993,7 +5003,7 @@ def sync_vendor_po_lines_batch(po_numbers: List[str]):
             _sync_safe(po_num)
 
 
-def rebuild_all_vendor_po_lines():
+def rebuild_all_vendor_po_lines(sort_by_date: bool = False):
     """
     Rebuild vendor_po_lines for ALL existing POs stored in SQLite.
 
@@ -5010,6 +5020,9 @@ def rebuild_all_vendor_po_lines():
 
     Does NOT rely on vendor_pos_cache.json.
 
+    Rebuild order does not affect the result, so POs are processed in storage order.
+    Pass sort_by_date=True to process (and log) newest POs first.
+
     Typical usage:
         python main.py --rebuild-po-lines
     """
@@ -5020,16 +5033,15 @@ def rebuild_all_vendor_po_lines():
     init_vendor_po_lines_table()
     
     bootstrap_headers_from_cache()
-    normalized = get_vendor_po_list(order_desc=True)
-    po_numbers = [po.get("purchaseOrderNumber") for po in normalized if po.get("purchaseOrderNumber")]
-    po_date_map = {
-        po.get("purchaseOrderNumber"): (
-            po.get("purchaseOrderDate")
-            or po.get("orderDetails", {}).get("purchaseOrderDate")
-        )
-        for po in normalized
-        if po.get("purchaseOrderNumber")
-    }
+    normalized = get_vendor_po_list(order_desc=True if sort_by_date else None)
+    po_numbers: List[str] = []
+    po_date_map: Dict[str, Any] = {}
+    for po in normalized:
+        po_num = po.get("purchaseOrderNumber")
+        if not po_num:
+            continue
+        po_numbers.append(po_num)
+        po_date_map[po_num] = po.get("purchaseOrderDate") or po.get("orderDetails", {}).get("purchaseOrderDate")
 
     if not po_numbers:
         logger.info("[VendorPO] No POs found in database")
@@ -5052,11 +5064,13 @@ def rebuild_all_vendor_po_lines():
         with time_block(f"vendor_po_rebuild_concurrent:{len(po_numbers)}"):
             return await run_single_arg(_rebuild_safe, po_numbers, max_concurrency=4)
 
-    try:
-        results = asyncio.run(_run_rebuild())
-    except RuntimeError:
-        # Fallback if already in an event loop
-        results = [_rebuild_safe(po_num) for po_num in po_numbers]
+    # Defer WAL checkpoints until the whole rebuild is written (one TRUNCATE at the end)
+    with deferred_wal_checkpoint():
+        try:
+            results = asyncio.run(_run_rebuild())
+        except RuntimeError:
+            # Fallback if already in an event loop
+            results = [_rebuild_safe(po_num) for po_num in po_numbers]
 
     success_count = sum(1 for _, err in results if err is None)
     error_count = len([1 for _, err in results if err is not None])
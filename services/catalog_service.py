@@ -2,9 +2,9 @@ import json
 import logging
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Set
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-from services.db import get_db_connection
+from services.db import get_db_connection, select_in_chunks
 from services.log_once import log_once
 from services.perf import time_block
 
@@ -132,85 +132,144 @@ def upsert_spapi_catalog(asin: str, payload: Dict[str, Any], db_path: Path = DEF
         with time_block("catalog_upsert"):
             conn.execute(
                 """
-                INSERT OR REPLACE INTO spapi_catalog (asin, title, image, payload, fetched_at)
+                INSERT INTO spapi_catalog (asin, title, image, payload, fetched_at)
                 VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(asin) DO UPDATE SET
+                    title = excluded.title,
+                    image = excluded.image,
+                    payload = excluded.payload,
+                    fetched_at = CURRENT_TIMESTAMP
                 """,
                 (asin, title, image, json.dumps(payload, ensure_ascii=False)),
             )
             conn.execute(
-                "INSERT OR REPLACE INTO spapi_catalog_meta (asin, sku) VALUES (?, ?)",
+                """
+                INSERT INTO spapi_catalog_meta (asin, sku) VALUES (?, ?)
+                ON CONFLICT(asin) DO UPDATE SET sku = excluded.sku
+                """,
                 (asin, sku),
             )
             conn.commit()
 
 
+# payload is deliberately not selected here: it is only needed for rows missing
+# title/image and is fetched separately for those ASINs (see _build_catalog_status).
+_CATALOG_STATUS_SQL = """
+    SELECT c.asin, c.title, c.image, c.barcode, m.sku
+    FROM spapi_catalog c
+    LEFT JOIN spapi_catalog_meta m ON c.asin = m.asin
+"""
+_CATALOG_PAYLOAD_SQL = "SELECT asin, payload FROM spapi_catalog"
+
+
+def _select_asins_in_chunks(conn, sql: str, asins: List[str], alias: str = "asin") -> List[Any]:
+    return list(
+        select_in_chunks(conn, lambda n: f"{sql} WHERE {alias} IN ({','.join('?' * n)})", asins)
+    )
+
+
+def _catalog_status_entry(
+    asin: str,
+    title: Optional[str],
+    image: Optional[str],
+    payload_raw: Optional[str],
+    barcode: Optional[str],
+    sku: Optional[str],
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Build one spapi_catalog_status entry, filling title/image from the payload when missing.
+    Returns (entry, parsed_payload_or_None).
+    """
+    parsed: Optional[Dict[str, Any]] = None
+    model_number = None
+    if (not title or not image) and payload_raw:
+        try:
+            parsed = json.loads(payload_raw)
+            sums = parsed.get("summaries") or []
+            for s in sums:
+                if not isinstance(s, dict):
+                    continue
+                title = title or s.get("itemName") or s.get("displayName") or s.get("title")
+                main_img = s.get("mainImage") or {}
+                if isinstance(main_img, dict):
+                    image = image or main_img.get("link")
+                imgs = parsed.get("images") or []
+                for img in imgs:
+                    if not isinstance(img, dict):
+                        continue
+                    image = image or img.get("link")
+                    variants = img.get("variants") or []
+                    if variants and isinstance(variants, list):
+                        image = image or (variants[0] or {}).get("link")
+                    nested = img.get("images") or []
+                    if nested and isinstance(nested, list):
+                        image = image or (nested[0] or {}).get("link")
+                attr_sets = parsed.get("attributeSets") or []
+                for attrs in attr_sets:
+                    if isinstance(attrs, dict):
+                        model_number = model_number or attrs.get("modelNumber")
+                        title = title or attrs.get("title")
+        except Exception as exc:
+            logger.warning(f"[Catalog] Failed to parse payload for {asin}: {exc}")
+    entry = {
+        "title": title,
+        "image": image,
+        "payload": parsed or (json.loads(payload_raw) if payload_raw else None),
+        "barcode": barcode,
+        "sku": sku or model_number,
+    }
+    return entry, parsed
+
+
+def _build_catalog_status(conn, rows: List[Any]) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    updates = []
+    need_payload = [row[0] for row in rows if not row[1] or not row[2]]
+    payloads: Dict[str, Optional[str]] = {}
+    if need_payload:
+        with time_block(f"catalog_status_payloads:{len(need_payload)}"):
+            payloads = dict(_select_asins_in_chunks(conn, _CATALOG_PAYLOAD_SQL, need_payload))
+    for asin, title, image, barcode, sku in rows:
+        entry, parsed = _catalog_status_entry(asin, title, image, payloads.get(asin), barcode, sku)
+        results[asin] = entry
+        if not entry["image"] or not entry["title"]:
+            updates.append((asin, entry["title"], entry["image"], parsed))
+    for asin, title, image, parsed in updates:
+        if not parsed:
+            continue
+        try:
+            conn.execute(
+                "UPDATE spapi_catalog SET title = ?, image = ? WHERE asin = ?",
+                (title, image, asin),
+            )
+            conn.commit()
+        except Exception as exc:
+            logger.warning(f"[Catalog] Failed to backfill title/image for {asin}: {exc}")
+    return results
+
+
 def spapi_catalog_status(db_path: Path = DEFAULT_CATALOG_DB_PATH) -> Dict[str, Dict[str, Any]]:
     if not db_path.exists():
         return {}
-    updates = []
-    results = {}
     with get_db_connection() as conn:
         with time_block("catalog_status_fetch"):
-            rows = conn.execute(
-                """
-                SELECT c.asin, c.title, c.image, c.payload, c.barcode, m.sku
-                FROM spapi_catalog c
-                LEFT JOIN spapi_catalog_meta m ON c.asin = m.asin
-                """
-            ).fetchall()
-        for asin, title, image, payload_raw, barcode, sku in rows:
-            parsed: Optional[Dict[str, Any]] = None
-            model_number = None
-            if (not title or not image) and payload_raw:
-                try:
-                    parsed = json.loads(payload_raw)
-                    sums = parsed.get("summaries") or []
-                    for s in sums:
-                        if not isinstance(s, dict):
-                            continue
-                        title = title or s.get("itemName") or s.get("displayName") or s.get("title")
-                        main_img = s.get("mainImage") or {}
-                        if isinstance(main_img, dict):
-                            image = image or main_img.get("link")
-                        imgs = parsed.get("images") or []
-                        for img in imgs:
-                            if not isinstance(img, dict):
-                                continue
-                            image = image or img.get("link")
-                            variants = img.get("variants") or []
-                            if variants and isinstance(variants, list):
-                                image = image or (variants[0] or {}).get("link")
-                            nested = img.get("images") or []
-                            if nested and isinstance(nested, list):
-                                image = image or (nested[0] or {}).get("link")
-                        attr_sets = parsed.get("attributeSets") or []
-                        for attrs in attr_sets:
-                            if isinstance(attrs, dict):
-                                model_number = model_number or attrs.get("modelNumber")
-                                title = title or attrs.get("title")
-                except Exception as exc:
-                    logger.warning(f"[Catalog] Failed to parse payload for {asin}: {exc}")
-            results[asin] = {
-                "title": title,
-                "image": image,
-                "payload": parsed or (json.loads(payload_raw) if payload_raw else None),
-                "barcode": barcode,
-                "sku": sku or model_number,
-            }
-            if not image or not title:
-                updates.append((asin, title, image, parsed))
-        for asin, title, image, parsed in updates:
-            if not parsed:
-                continue
-            try:
-                conn.execute(
-                    "UPDATE spapi_catalog SET title = ?, image = ? WHERE asin = ?",
-                    (title, image, asin),
-                )
-                conn.commit()
-            except Exception as exc:
-                logger.warning(f"[Catalog] Failed to backfill title/image for {asin}: {exc}")
-    return results
+            rows = conn.execute(_CATALOG_STATUS_SQL).fetchall()
+        return _build_catalog_status(conn, rows)
+
+
+def spapi_catalog_status_for(
+    asins: Iterable[str], db_path: Path = DEFAULT_CATALOG_DB_PATH
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Same shape as spapi_catalog_status, restricted to the given ASINs.
+    """
+    wanted = sorted({a for a in asins if a})
+    if not wanted or not db_path.exists():
+        return {}
+    with get_db_connection() as conn:
+        with time_block(f"catalog_status_fetch_for:{len(wanted)}"):
+            rows = _select_asins_in_chunks(conn, _CATALOG_STATUS_SQL, wanted, alias="c.asin")
+        return _build_catalog_status(conn, rows)
 
 
 def update_catalog_barcode(asin: str, barcode: str, db_path: Path = DEFAULT_CATALOG_DB_PATH) -> bool:
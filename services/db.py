@@ -1,10 +1,11 @@
 import logging
 import sqlite3
 from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
 from pathlib import Path
 from threading import Lock
-from typing import Any, Optional
+from typing import Any, Callable, Iterator, Optional, Sequence
 
 logger = logging.getLogger(__name__)
 CATALOG_DB_PATH = Path(__file__).resolve().parent.parent / "catalog.db"
@@ -20,6 +21,40 @@ CATALOG_DB_PATH = Path(__file__).resolve().parent.parent / "catalog.db"
 _db_write_lock = Lock()
 _db_timeout = 10  # seconds
 
+# When set, connections opened by get_db_connection apply this wal_autocheckpoint
+# value (pages) instead of SQLite's default of 1000. See deferred_wal_checkpoint().
+# A ContextVar, not a module global: only code running in the bulk job's context (its
+# asyncio tasks and to_thread workers inherit it) sees the override, never request threads.
+_wal_autocheckpoint_override: ContextVar[Optional[int]] = ContextVar(
+    "wal_autocheckpoint_override", default=None
+)
+BULK_WAL_AUTOCHECKPOINT_PAGES = 100_000
+# Largest IN (...) list bound in one statement by select_in_chunks; keeps every lookup
+# under the 999 bound-variable limit of older SQLite builds.
+IN_CHUNK_SIZE = 500
+
+# Session pragmas applied to every connection (journal_mode=WAL persists in the file,
+# the others are per-connection). synchronous=NORMAL is the recommended WAL setting:
+# commits no longer fsync, only checkpoints do.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MB page cache
+    "PRAGMA mmap_size=268435456",  # 256 MB memory-mapped reads
+)
+
+
+def _configure_conn(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Apply the shared row factory and session pragmas to a new connection."""
+    conn.row_factory = sqlite3.Row
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    wal_autocheckpoint = _wal_autocheckpoint_override.get()
+    if wal_autocheckpoint is not None:
+        conn.execute(f"PRAGMA wal_autocheckpoint={int(wal_autocheckpoint)}")
+    return conn
+
 
 @contextmanager
 def get_db_connection_for_path(db_path: Path):
@@ -36,9 +71,7 @@ def get_db_connection_for_path(db_path: Path):
     else:
         conn = None
         try:
-            conn = sqlite3.connect(resolved, timeout=_db_timeout)
-            conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA journal_mode=WAL")
+            conn = _configure_conn(sqlite3.connect(resolved, timeout=_db_timeout))
             yield conn
         finally:
             if conn:
@@ -49,16 +82,14 @@ def get_db_connection():
     """
     Context manager for safe SQLite connection.
     - Enforces timeout to prevent infinite waits
-    - Enables WAL mode for better concurrency
+    - Enables WAL mode (+ session pragmas, see _configure_conn) for better concurrency
     - Ensures cleanup even on exception
     """
     conn = None
     try:
         conn = sqlite3.connect(CATALOG_DB_PATH, timeout=_db_timeout)
-        conn.row_factory = sqlite3.Row
-        # Enable WAL (Write-Ahead Logging) for better concurrency
-        # Allows multiple readers while one writer is active
-        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL (Write-Ahead Logging) allows multiple readers while one writer is active
+        _configure_conn(conn)
         yield conn
     except sqlite3.DatabaseError as e:
         logger.error(f"[DB] Database error: {e}", exc_info=True)
@@ -74,6 +105,30 @@ def get_db_connection():
                 logger.warning(f"[DB] Error closing connection: {e}")
 
 
+@contextmanager
+def deferred_wal_checkpoint(pages: int = BULK_WAL_AUTOCHECKPOINT_PAGES):
+    """
+    Raise the WAL auto-checkpoint threshold for bulk rebuilds.
+    - Connections opened inside the block checkpoint only after `pages` WAL pages
+      (0 disables auto-checkpointing), so writers are not stalled mid-batch
+    - Scoped to the caller's context (including asyncio tasks / to_thread workers it
+      starts); connections opened by other threads keep the default threshold
+    - A single PRAGMA wal_checkpoint(TRUNCATE) runs when the outermost block exits
+    """
+    previous = _wal_autocheckpoint_override.get()
+    token = _wal_autocheckpoint_override.set(pages)
+    try:
+        yield
+    finally:
+        _wal_autocheckpoint_override.reset(token)
+        if previous is None:
+            try:
+                with get_db_connection() as conn:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except Exception as exc:
+                logger.warning(f"[DB] WAL checkpoint after bulk write failed: {exc}")
+
+
 def execute_write(sql: str, params: tuple = (), commit: bool = True):
     """
     Serialize all write operations to prevent SQLITE_BUSY errors.
@@ -118,6 +173,41 @@ def execute_many_write(sql: str, seq_of_params: list[tuple], commit: bool = True
                 raise
 
 
+@contextmanager
+def write_transaction():
+    """
+    Multi-statement write under the same write lock/timeout safety.
+    - Yields one connection; every statement in the block shares one transaction
+    - Commits when the block exits normally, rolls back on any exception
+    """
+    with _db_write_lock:
+        with get_db_connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                if "database is locked" in str(e):
+                    logger.error(f"[DB] Transaction locked after {_db_timeout}s timeout: {e}")
+                raise
+            except Exception:
+                conn.rollback()
+                raise
+
+
+def select_in_chunks(
+    conn: sqlite3.Connection, sql_for_count: Callable[[int], str], values: Sequence[Any]
+) -> Iterator[sqlite3.Row]:
+    """
+    Run an IN (...) lookup over values, at most IN_CHUNK_SIZE values per statement.
+    sql_for_count(n) returns the statement for a chunk of n values; rows are yielded
+    chunk by chunk in the order values were given.
+    """
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        chunk = values[start : start + IN_CHUNK_SIZE]
+        yield from conn.execute(sql_for_count(len(chunk)), chunk)
+
+
 def init_vendor_rt_sales_state_table() -> None:
     """
     Create vendor_rt_sales_state table if it does not exist.
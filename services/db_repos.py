@@ -1,3 +1,4 @@
+import functools
 import logging
 from typing import Any, Dict, List, Tuple
 
@@ -6,6 +7,85 @@ from services.perf import time_block
 
 logger = logging.getLogger(__name__)
 
+# SQL is kept at module level so each call reuses the same statement text
+# (and therefore SQLite's per-connection statement cache).
+_SQL_INSERT_LINE = """
+    INSERT INTO vendor_po_lines
+    (po_number, ship_to_location, asin, sku, ordered_qty, accepted_qty,
+     cancelled_qty, shipped_qty, received_qty, shortage_qty, pending_qty, last_changed_utc)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_SELECT_LINES_FOR_PO = """
+    SELECT po_number, ship_to_location, asin, sku, ordered_qty, accepted_qty,
+           cancelled_qty, shipped_qty, received_qty, shortage_qty, pending_qty, last_changed_utc
+    FROM vendor_po_lines
+    WHERE po_number = ?
+    ORDER BY asin
+"""
+
+_SQL_TOTALS_FOR_PO = """
+    SELECT
+        COALESCE(SUM(ordered_qty), 0) AS total_ordered,
+        COALESCE(SUM(accepted_qty), 0) AS total_accepted,
+        COALESCE(SUM(cancelled_qty), 0) AS total_cancelled,
+        COALESCE(SUM(received_qty), 0) AS total_received,
+        COALESCE(SUM(pending_qty), 0) AS total_pending,
+        COALESCE(SUM(shortage_qty), 0) AS total_shortage
+    FROM vendor_po_lines
+    WHERE po_number = ?
+"""
+
+
+def _qmarks(n_params: int) -> str:
+    return ",".join(["?"] * n_params)
+
+
+@functools.lru_cache(maxsize=64)
+def _totals_sql(n_params: int) -> str:
+    return f"""
+    SELECT
+        po_number,
+        COALESCE(SUM(ordered_qty), 0) AS total_ordered,
+        COALESCE(SUM(accepted_qty), 0) AS total_accepted,
+        COALESCE(SUM(cancelled_qty), 0) AS total_cancelled,
+        COALESCE(SUM(received_qty), 0) AS total_received,
+        COALESCE(SUM(pending_qty), 0) AS total_pending,
+        COALESCE(SUM(shortage_qty), 0) AS total_shortage
+    FROM vendor_po_lines
+    WHERE po_number IN ({_qmarks(n_params)})
+    GROUP BY po_number
+    """
+
+
+@functools.lru_cache(maxsize=64)
+def _details_sql(n_params: int) -> str:
+    return f"""
+    SELECT
+        po_number,
+        asin,
+        sku,
+        accepted_qty,
+        ordered_qty,
+        received_qty
+    FROM vendor_po_lines
+    WHERE po_number IN ({_qmarks(n_params)})
+    """
+
+
+@functools.lru_cache(maxsize=64)
+def _rejected_sql(n_params: int) -> str:
+    return f"""
+    SELECT po_number, asin, sku, ship_to_location, ordered_qty, cancelled_qty, accepted_qty
+    FROM vendor_po_lines
+    WHERE po_number IN ({_qmarks(n_params)})
+      AND (
+        COALESCE(cancelled_qty, 0) > 0
+        OR COALESCE(shortage_qty, 0) > 0
+        OR COALESCE(accepted_qty, 0) < COALESCE(ordered_qty, 0)
+      )
+    """
+
 
 def init_vendor_po_lines_table() -> None:
     sql = """
@@ -74,12 +154,6 @@ def insert_vendor_po_line(
     pending_qty: int,
     last_changed_utc: str,
 ) -> None:
-    sql = """
-    INSERT INTO vendor_po_lines
-    (po_number, ship_to_location, asin, sku, ordered_qty, accepted_qty,
-     cancelled_qty, shipped_qty, received_qty, shortage_qty, pending_qty, last_changed_utc)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
     params = (
         po_number,
         ship_to_location,
@@ -96,7 +170,7 @@ def insert_vendor_po_line(
     )
     try:
         with time_block("vendor_po_lines_insert"):
-            execute_write(sql, params)
+            execute_write(_SQL_INSERT_LINE, params)
     except Exception as exc:
         logger.error(f"[DBRepo] Failed to insert vendor_po_lines row for PO {po_number}, ASIN {asin}: {exc}", exc_info=True)
         raise
@@ -108,15 +182,9 @@ def bulk_insert_vendor_po_lines(rows: List[Tuple[Any, ...]]) -> None:
     """
     if not rows:
         return
-    sql = """
-    INSERT INTO vendor_po_lines
-    (po_number, ship_to_location, asin, sku, ordered_qty, accepted_qty,
-     cancelled_qty, shipped_qty, received_qty, shortage_qty, pending_qty, last_changed_utc)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
     try:
         with time_block(f"vendor_po_lines_bulk_insert:{len(rows)}"):
-            execute_many_write(sql, rows)
+            execute_many_write(_SQL_INSERT_LINE, rows)
     except Exception as exc:
         logger.error(f"[DBRepo] Failed bulk insert for vendor_po_lines ({len(rows)} rows): {exc}", exc_info=True)
         raise
@@ -126,16 +194,7 @@ def get_vendor_po_lines(po_number: str) -> List[Dict[str, Any]]:
     try:
         with time_block("vendor_po_lines_fetch"):
             with get_db_connection() as conn:
-                rows = conn.execute(
-                    """
-                    SELECT po_number, ship_to_location, asin, sku, ordered_qty, accepted_qty,
-                           cancelled_qty, shipped_qty, received_qty, shortage_qty, pending_qty, last_changed_utc
-                    FROM vendor_po_lines
-                    WHERE po_number = ?
-                    ORDER BY asin
-                    """,
-                    (po_number,),
-                ).fetchall()
+                rows = conn.execute(_SQL_SELECT_LINES_FOR_PO, (po_number,)).fetchall()
                 return [dict(row) for row in rows]
     except Exception as exc:
         logger.error(f"[DBRepo] Failed to fetch vendor_po_lines for PO {po_number}: {exc}", exc_info=True)
@@ -145,26 +204,10 @@ def get_vendor_po_lines(po_number: str) -> List[Dict[str, Any]]:
 def get_vendor_po_line_totals(po_numbers: List[str]) -> Dict[str, Dict[str, int]]:
     if not po_numbers:
         return {}
-    qmarks = ",".join(["?"] * len(po_numbers))
     try:
         with time_block(f"vendor_po_lines_totals:{len(po_numbers)}"):
             with get_db_connection() as conn:
-                rows = conn.execute(
-                    f"""
-                    SELECT
-                        po_number,
-                        COALESCE(SUM(ordered_qty), 0) AS total_ordered,
-                        COALESCE(SUM(accepted_qty), 0) AS total_accepted,
-                        COALESCE(SUM(cancelled_qty), 0) AS total_cancelled,
-                        COALESCE(SUM(received_qty), 0) AS total_received,
-                        COALESCE(SUM(pending_qty), 0) AS total_pending,
-                        COALESCE(SUM(shortage_qty), 0) AS total_shortage
-                    FROM vendor_po_lines
-                    WHERE po_number IN ({qmarks})
-                    GROUP BY po_number
-                    """,
-                    po_numbers,
-                ).fetchall()
+                rows = conn.execute(_totals_sql(len(po_numbers)), po_numbers).fetchall()
                 return {row["po_number"]: dict(row) for row in rows}
     except Exception as exc:
         logger.error(f"[DBRepo] Failed to aggregate vendor_po_lines for {len(po_numbers)} POs: {exc}", exc_info=True)
@@ -175,20 +218,7 @@ def get_vendor_po_line_totals_for_po(po_number: str) -> Dict[str, int]:
     try:
         with time_block("vendor_po_lines_totals_single"):
             with get_db_connection() as conn:
-                row = conn.execute(
-                    """
-                    SELECT
-                        COALESCE(SUM(ordered_qty), 0) AS total_ordered,
-                        COALESCE(SUM(accepted_qty), 0) AS total_accepted,
-                        COALESCE(SUM(cancelled_qty), 0) AS total_cancelled,
-                        COALESCE(SUM(received_qty), 0) AS total_received,
-                        COALESCE(SUM(pending_qty), 0) AS total_pending,
-                        COALESCE(SUM(shortage_qty), 0) AS total_shortage
-                    FROM vendor_po_lines
-                    WHERE po_number = ?
-                    """,
-                    (po_number,),
-                ).fetchone()
+                row = conn.execute(_SQL_TOTALS_FOR_PO, (po_number,)).fetchone()
                 return dict(row) if row else {}
     except Exception as exc:
         logger.error(f"[DBRepo] Failed to aggregate vendor_po_lines for PO {po_number}: {exc}", exc_info=True)
@@ -202,24 +232,10 @@ def get_vendor_po_line_details(po_numbers: List[str]) -> Dict[str, List[Dict[str
     """
     if not po_numbers:
         return {}
-    qmarks = ",".join(["?"] * len(po_numbers))
     try:
         with time_block(f"vendor_po_lines_details:{len(po_numbers)}"):
             with get_db_connection() as conn:
-                rows = conn.execute(
-                    f"""
-                    SELECT
-                        po_number,
-                        asin,
-                        sku,
-                        accepted_qty,
-                        ordered_qty,
-                        received_qty
-                    FROM vendor_po_lines
-                    WHERE po_number IN ({qmarks})
-                    """,
-                    po_numbers,
-                ).fetchall()
+                rows = conn.execute(_details_sql(len(po_numbers)), po_numbers).fetchall()
                 
                 # Group by po_number
                 result = {}
@@ -248,23 +264,10 @@ def count_vendor_po_lines() -> int:
 def get_rejected_vendor_po_lines(po_numbers: List[str]) -> List[Dict[str, Any]]:
     if not po_numbers:
         return []
-    qmarks = ",".join(["?"] * len(po_numbers))
     try:
         with time_block(f"vendor_po_lines_rejected:{len(po_numbers)}"):
             with get_db_connection() as conn:
-                rows = conn.execute(
-                    f"""
-                    SELECT po_number, asin, sku, ship_to_location, ordered_qty, cancelled_qty, accepted_qty
-                    FROM vendor_po_lines
-                    WHERE po_number IN ({qmarks})
-                      AND (
-                        COALESCE(cancelled_qty, 0) > 0
-                        OR COALESCE(shortage_qty, 0) > 0
-                        OR COALESCE(accepted_qty, 0) < COALESCE(ordered_qty, 0)
-                      )
-                    """,
-                    po_numbers,
-                ).fetchall()
+                rows = conn.execute(_rejected_sql(len(po_numbers)), po_numbers).fetchall()
                 return [dict(row) for row in rows]
     except Exception as exc:
         logger.warning(f"[DBRepo] Failed to fetch rejected vendor_po_lines for {len(po_numbers)} POs: {exc}")
@@ -1,11 +1,19 @@
-import functools
 import json
 import logging
+import mmap
+import os
+import pickle
 from pathlib import Path
-from typing import Any, Dict, Optional
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple, Union
 
 from services.perf import time_block
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
 ROOT = Path(__file__).resolve().parent.parent
@@ -14,13 +22,77 @@ DEFAULT_ASIN_CACHE_PATH = ROOT / "asin_image_cache.json"
 DEFAULT_PO_TRACKER_PATH = ROOT / "po_tracker.json"
 DEFAULT_OOS_STATE_PATH = ROOT / "oos_state.json"
 
+# Parsed JSON per file, keyed by path and validated against (st_mtime_ns, st_size)
+# so repeat reads are a dict lookup while external edits are still picked up.
+_CACHE: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
+_CACHE_LOCK = Lock()
+
+
+def loads_json_bytes(raw: Union[bytes, str]) -> Any:
+    """
+    Parse UTF-8 JSON bytes (or an already-decoded str), using orjson when installed.
+    Falls back to the stdlib for anything orjson rejects (e.g. NaN literals).
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode("utf-8")
+    return json.loads(raw)
+
+
+# Files at least this big are parsed straight from a read-only memory map (orjson only), so
+# the raw bytes are never copied into the heap next to the parsed result. Not on Windows,
+# where a live mapping would make a concurrent rewrite of the same file fail.
+_MMAP_MIN_BYTES = 1 << 20
+
+
+def read_json_file(path: Path) -> Any:
+    """
+    Parse the JSON file at `path` (see loads_json_bytes), memory-mapping large files.
+    For one-shot CLI/debug tools only: _write_json rewrites files in place, and a
+    truncation during an mmap parse raises SIGBUS, so the server reads via _read_json.
+    """
+    if orjson is None or os.name == "nt":
+        return loads_json_bytes(path.read_bytes())
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size < _MMAP_MIN_BYTES:
+            return loads_json_bytes(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                return orjson.loads(view)
+            except orjson.JSONDecodeError:
+                return json.loads(view.tobytes().decode("utf-8"))
+            finally:
+                view.release()
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 
 def _read_json(path: Path, default: Any, raise_on_error: bool = False) -> Any:
-    if not path.exists():
+    key = _stat_key(path)
+    if key is None:
+        with _CACHE_LOCK:
+            _CACHE.pop(path, None)
         return default
+    with _CACHE_LOCK:
+        cached = _CACHE.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
     try:
         with time_block(f"json_read:{path.name}"):
-            data = json.loads(path.read_text(encoding="utf-8"))
+            data = loads_json_bytes(path.read_bytes())
+        with _CACHE_LOCK:
+            _CACHE[path] = (key, data)
         return data
     except Exception as exc:
         logger.warning(f"[json_cache] Failed to read {path}: {exc}")
@@ -36,19 +108,69 @@ def _write_json(path: Path, payload: Any) -> None:
             path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
     except Exception as exc:
         logger.warning(f"[json_cache] Failed to write {path}: {exc}")
+        with _CACHE_LOCK:
+            _CACHE.pop(path, None)
+        return
+    key = _stat_key(path)
+    with _CACHE_LOCK:
+        if key is None:
+            _CACHE.pop(path, None)
+        else:
+            _CACHE[path] = (key, payload)
+
+
+def _snapshot_path(path: Path) -> Path:
+    return path.with_name(path.name + ".pkl")
+
+
+def read_json_snapshot(path: Path) -> Optional[Any]:
+    """
+    Return the parsed JSON of `path` from its pickle sidecar (`<name>.pkl`), or None when
+    there is no sidecar or it was written for a different (st_mtime_ns, st_size) of `path`.
+    Meant for CLI/debug tools that re-read the same large file across separate runs.
+    """
+    key = _stat_key(path)
+    if key is None:
+        return None
+    try:
+        with _snapshot_path(path).open("rb") as f:
+            # The source key is pickled ahead of the data so a stale sidecar costs one small read.
+            if pickle.load(f) != key:
+                return None
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def load_json_snapshot(path: Path) -> Any:
+    """Parse `path` via read_json_snapshot(), refreshing the pickle sidecar on a miss."""
+    data = read_json_snapshot(path)
+    if data is not None:
+        return data
+    key = _stat_key(path)
+    data = read_json_file(path)
+    if key is not None:
+        snapshot = _snapshot_path(path)
+        tmp = snapshot.with_name(f"{snapshot.name}.{os.getpid()}.tmp")
+        try:
+            with tmp.open("wb") as f:
+                pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, snapshot)
+        except OSError as exc:
+            logger.warning(f"[json_cache] Failed to write snapshot {snapshot}: {exc}")
+            tmp.unlink(missing_ok=True)
+    return data
 
 
-@functools.lru_cache(maxsize=32)
 def load_vendor_pos_cache(path: Optional[Path] = None, *, raise_on_error: bool = False) -> Any:
     return _read_json(path or DEFAULT_VENDOR_POS_CACHE, {}, raise_on_error=raise_on_error)
 
 
 def save_vendor_pos_cache(payload: Any, path: Optional[Path] = None) -> None:
-    load_vendor_pos_cache.cache_clear()
     _write_json(path or DEFAULT_VENDOR_POS_CACHE, payload)
 
 
-@functools.lru_cache(maxsize=32)
 def load_asin_cache(path: Optional[Path] = None) -> Dict[str, Any]:
     cache = _read_json(path or DEFAULT_ASIN_CACHE_PATH, {})
     if not isinstance(cache, dict):
@@ -57,27 +179,22 @@ def load_asin_cache(path: Optional[Path] = None) -> Dict[str, Any]:
 
 
 def save_asin_cache(cache: Dict[str, Any], path: Optional[Path] = None) -> None:
-    load_asin_cache.cache_clear()
     _write_json(path or DEFAULT_ASIN_CACHE_PATH, cache)
 
 
-@functools.lru_cache(maxsize=32)
 def load_po_tracker(path: Optional[Path] = None) -> Dict[str, Any]:
     data = _read_json(path or DEFAULT_PO_TRACKER_PATH, {})
     return data if isinstance(data, dict) else {}
 
 
 def save_po_tracker(tracker: Dict[str, Any], path: Optional[Path] = None) -> None:
-    load_po_tracker.cache_clear()
     _write_json(path or DEFAULT_PO_TRACKER_PATH, tracker)
 
 
-@functools.lru_cache(maxsize=32)
 def load_oos_state(path: Optional[Path] = None) -> Dict[str, Any]:
     data = _read_json(path or DEFAULT_OOS_STATE_PATH, {})
     return data if isinstance(data, dict) else {}
 
 
 def save_oos_state(state: Dict[str, Any], path: Optional[Path] = None) -> None:
-    load_oos_state.cache_clear()
     _write_json(path or DEFAULT_OOS_STATE_PATH, state)
@@ -56,6 +56,9 @@ def seed_oos_from_rejected_lines(
             asin_val = (row.get("asin") or "").strip()
             if not po_num or not asin_val:
                 continue
+            # oos_state keys are the already-processed po::asin pairs; skip them up front.
+            if f"{po_num}::{asin_val}" in state:
+                continue
             ordered_qty = row.get("ordered_qty") or 0
             cancelled_qty = row.get("cancelled_qty") or 0
             accepted_qty = row.get("accepted_qty") or 0
@@ -100,12 +103,17 @@ def seed_oos_from_rejected_payload(purchase_orders: List[Dict[str, Any]]) -> int
         items = d.get("items") or []
         for it in items:
             ack = it.get("acknowledgementStatus") or {}
+            # Read the status from the current payload on every call: results memoized per
+            # PO/line go stale when a PO's status changes, and caching just the upper()/compare
+            # on the status string measured no faster than doing it inline.
             conf = (ack.get("confirmationStatus") or it.get("status") or "").upper()
             if conf != "REJECTED":
                 continue
             asin = it.get("amazonProductIdentifier") or ""
             if not po_num or not asin:
                 continue
+            if f"{po_num}::{asin}" in state:
+                continue
             sku = it.get("vendorProductIdentifier") or ""
             qty_raw = it.get("orderedQuantity") or {}
             qty_num = None
@@ -1,35 +1,98 @@
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import Any, Callable, Dict, List, Tuple
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+import requests
 from fastapi import HTTPException
 
 from services.perf import time_block
 
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import (
+        Image,
+        Paragraph,
+        SimpleDocTemplate,
+        Spacer,
+        Table,
+        TableStyle,
+    )
+except ImportError:  # pragma: no cover
+    getSampleStyleSheet = None  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
+if getSampleStyleSheet is not None:
+    # Built once; never mutate these per call (the sample sheet's "Normal" is shared).
+    _RL_BASE_STYLES = getSampleStyleSheet()
+    # The heading, summary and table cells all use this one style.
+    _PDF_NORMAL_STYLE = ParagraphStyle(
+        "PicklistNormal", parent=_RL_BASE_STYLES["Normal"], fontSize=9
+    )
+
+_IMAGE_FETCH_WORKERS = 16
+_IMAGE_FETCH_TIMEOUT_SECONDS = 15
+# Downloaded images are kept across PDF builds, least recently used evicted first, up to
+# this many bytes in total so a desktop session never holds more than a few MB of images.
+_IMAGE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+_IMAGE_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
+_IMAGE_CACHE_BYTES = 0
+_IMAGE_CACHE_LOCK = Lock()
+
+
+def _parse_qty(value: Any) -> Optional[float]:
+    """
+    Quantity as a number; None when it is not numeric. Ints/floats (the usual case,
+    straight from SQLite or the API payload) skip float() and the exception path.
+    """
+    if value.__class__ is int or value.__class__ is float:
+        return value
+    if not value:
+        return 0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _total_qty(item: Dict[str, Any]) -> Any:
+    return item.get("totalQty") or 0
+
 
 def consolidate_picklist(
     po_numbers: List[str],
     po_records: List[Dict[str, Any]],
     load_oos_state_fn,
     save_oos_state_fn,
-    spapi_catalog_status_fn,
+    spapi_catalog_status_fn: Callable[[List[str]], Dict[str, Dict[str, Any]]],
     upsert_oos_entry_fn,
     fetch_rejected_lines_fn: Callable[[List[str]], List[Dict[str, Any]]],
 ) -> Dict[str, Any]:
     if not po_records:
         return {"summary": {"numPos": 0, "totalUnits": 0, "totalLines": 0, "warning": "No POs"}, "items": []}
 
-    selected = [po for po in po_records if po.get("purchaseOrderNumber") in po_numbers]
+    po_numbers_set = frozenset(po_numbers)
+    selected = [po for po in po_records if po.get("purchaseOrderNumber") in po_numbers_set]
     if not selected:
         return {"summary": {"numPos": 0, "totalUnits": 0, "totalLines": 0, "warning": "No matching POs"}, "items": []}
 
-
-    catalog = spapi_catalog_status_fn()
+    # Only the ASINs on the selected POs need catalog info; loading the whole
+    # catalog on every preview/PDF click dominated warm calls.
+    picklist_asins = {
+        it.get("amazonProductIdentifier")
+        for po in selected
+        for it in ((po.get("orderDetails") or {}).get("items") or [])
+    }
+    picklist_asins.discard(None)
+    picklist_asins.discard("")
+    catalog = spapi_catalog_status_fn(sorted(picklist_asins))
 
     consolidated: Dict[Tuple[str, str], Dict[str, Any]] = {}
-    total_units = 0
 
     # Build a map of fully rejected lines (accepted_qty == 0 AND ordered_qty > 0)
     # These should be excluded from picklist entirely
@@ -41,114 +104,160 @@ def consolidate_picklist(
             po_num = (row.get("po_number") or "").strip()
             asin = (row.get("asin") or "").strip()
             if po_num and asin:
-                try:
-                    accepted_qty = float(row.get("accepted_qty") or 0)
-                    ordered_qty = float(row.get("ordered_qty") or 0)
-                except Exception:
+                accepted_qty = _parse_qty(row.get("accepted_qty"))
+                ordered_qty = _parse_qty(row.get("ordered_qty"))
+                if accepted_qty is None or ordered_qty is None:
                     continue
                 # Only mark as fully rejected if accepted is 0 and ordered is > 0
                 if accepted_qty == 0 and ordered_qty > 0:
-                    key = f"{po_num}::{asin}"
-                    fully_rejected_lines.add(key)
+                    fully_rejected_lines.add(po_num + "::" + asin)
     except Exception as exc:
         logger.warning(f"[Picklist] Failed to load vendor_po_lines for rejection filter: {exc}")
 
+    # Hot loop: bind lookups to locals once instead of per line.
+    catalog_get = catalog.get
+    consolidated_get = consolidated.get
+    rejected = fully_rejected_lines
+
     with time_block("picklist_consolidate_items"):
         for po in selected:
             po_num = po.get("purchaseOrderNumber") or ""
             d = po.get("orderDetails") or {}
             items = d.get("items") or []
+            po_prefix = po_num + "::"
             for it in items:
-                asin = it.get("amazonProductIdentifier") or ""
-                sku = it.get("vendorProductIdentifier") or ""
-                key_po_asin = f"{po_num}::{asin}" if asin else ""
-
-                # SKIP fully rejected lines entirely (not on picklist)
-                if key_po_asin in fully_rejected_lines:
+                it_get = it.get
+                asin = it_get("amazonProductIdentifier") or ""
+                if not asin:
                     continue
 
-                if not asin:
+                # SKIP fully rejected lines entirely (not on picklist)
+                if po_prefix + asin in rejected:
                     continue
 
                 # Use ACCEPTED quantity, not ordered
                 # First try acknowledgementStatus.acceptedQuantity (for items with status)
                 accepted_qty = 0
-                ack = it.get("acknowledgementStatus") or {}
+                ack = it_get("acknowledgementStatus") or {}
                 if isinstance(ack, dict):
-                    try:
-                        acc_qty_obj = ack.get("acceptedQuantity") or {}
-                        accepted_qty = float(acc_qty_obj.get("amount") or 0)
-                    except (TypeError, ValueError):
-                        accepted_qty = 0
+                    acc_qty_obj = ack.get("acceptedQuantity") or {}
+                    accepted_qty = _parse_qty(acc_qty_obj.get("amount")) or 0
                 
                 # If no accepted quantity, fall back to ordered quantity (for fresh POs)
                 if accepted_qty == 0:
-                    qty = it.get("orderedQuantity") or {}
-                    qty_amount = qty.get("amount")
-                    try:
-                        accepted_qty = float(qty_amount or 0)
-                    except (TypeError, ValueError):
-                        accepted_qty = 0
+                    qty = it_get("orderedQuantity") or {}
+                    accepted_qty = _parse_qty(qty.get("amount")) or 0
 
                 # Skip lines with 0 accepted quantity
                 if accepted_qty == 0:
                     continue
 
+                sku = it_get("vendorProductIdentifier") or ""
                 ckey = (asin, sku)
-                is_oos = False
-                
-                # Only mark as OOS if the item has 0 accepted quantity
-                # Do NOT check the oos_state dictionary as it accumulates stale data
-                if accepted_qty == 0:
-                    is_oos = True
-
-                if ckey not in consolidated:
-                    info = catalog.get(asin) or {}
-                    master_sku = info.get("sku")
-                    line_sku = master_sku or sku or ""
-                    consolidated[ckey] = {
+                entry = consolidated_get(ckey)
+                if entry is None:
+                    info = catalog_get(asin) or {}
+                    line_sku = info.get("sku") or sku or ""
+                    # Lines reaching here always have accepted_qty > 0, so never OOS.
+                    # Do NOT check the oos_state dictionary as it accumulates stale data
+                    entry = consolidated[ckey] = {
                         "asin": asin,
                         "externalId": sku,
                         "sku": line_sku,
                         "title": info.get("title"),
                         "image": info.get("image"),
                         "totalQty": 0,
-                        "isOutOfStock": is_oos,
+                        "isOutOfStock": False,
                     }
                 # Add accepted quantity (not ordered)
-                consolidated[ckey]["totalQty"] += int(accepted_qty)
-                # Count all accepted items in total
-                total_units += int(accepted_qty)
+                entry["totalQty"] += int(accepted_qty)
 
-    items_out = list(consolidated.values())
-    items_out.sort(key=lambda x: (0 - (x.get("totalQty") or 0)))
+    # Every accepted unit lands in exactly one entry, so the grand total is the
+    # sum of the per-line totals rather than a second running counter.
+    total_units = sum(entry["totalQty"] for entry in consolidated.values())
+    # Largest lines first; sorted() is stable, so equal quantities keep insertion order.
+    items_out = sorted(consolidated.values(), key=_total_qty, reverse=True)
     summary = {
         "numPos": len(selected),
         "totalUnits": total_units,
-        "totalLines": len(items_out),
+        "totalLines": len(consolidated),
         "warning": None,
     }
     return {"summary": summary, "items": items_out}
 
 
-def generate_picklist_pdf(po_numbers: List[str], items: List[Dict[str, Any]], summary: Dict[str, Any]) -> bytes:
+def _cache_image(url: str, blob: bytes) -> None:
+    global _IMAGE_CACHE_BYTES
+    if len(blob) > _IMAGE_CACHE_MAX_BYTES:
+        return
+    with _IMAGE_CACHE_LOCK:
+        previous = _IMAGE_CACHE.pop(url, None)
+        if previous is not None:
+            _IMAGE_CACHE_BYTES -= len(previous)
+        _IMAGE_CACHE[url] = blob
+        _IMAGE_CACHE_BYTES += len(blob)
+        while _IMAGE_CACHE_BYTES > _IMAGE_CACHE_MAX_BYTES:
+            _, evicted = _IMAGE_CACHE.popitem(last=False)
+            _IMAGE_CACHE_BYTES -= len(evicted)
+
+
+def _fetch_image_bytes(url: str) -> bytes:
+    # Raises on failure so that errors are not cached; only good images are kept.
+    with _IMAGE_CACHE_LOCK:
+        blob = _IMAGE_CACHE.get(url)
+        if blob is not None:
+            _IMAGE_CACHE.move_to_end(url)
+            return blob
+    resp = requests.get(url, timeout=_IMAGE_FETCH_TIMEOUT_SECONDS)
+    resp.raise_for_status()
+    blob = resp.content
+    _cache_image(url, blob)
+    return blob
+
+
+def _try_fetch_image_bytes(url: str) -> Optional[bytes]:
+    try:
+        return _fetch_image_bytes(url)
+    except Exception as exc:
+        logger.warning("[Picklist] Image fetch failed for %s: %s", url, exc)
+        return None
+
+
+def _prefetch_images(urls: Iterable[str]) -> Dict[str, Optional[bytes]]:
+    """
+    Download remote picklist images concurrently (reportlab fetches them one by one).
+    Returns url -> bytes, or None when the download failed.
+    """
+    remote = sorted({u for u in urls if u.startswith(("http://", "https://"))})
+    if not remote:
+        return {}
+    with time_block("picklist_pdf_image_prefetch"):
+        with ThreadPoolExecutor(max_workers=min(_IMAGE_FETCH_WORKERS, len(remote))) as pool:
+            return dict(zip(remote, pool.map(_try_fetch_image_bytes, remote), strict=True))
+
+
+def _img_for(img_url: str, image_blobs: Dict[str, Optional[bytes]]) -> Any:
+    """Image flowable for a picklist row, or "" when there is no usable image."""
+    if not img_url or image_blobs.get(img_url, img_url) is None:
+        # No image, or the prefetch failed: leave the cell blank.
+        return ""
+    img_src = BytesIO(image_blobs[img_url]) if img_url in image_blobs else img_url
+    try:
+        return Image(img_src, width=38 * mm, height=38 * mm, kind="proportional")
+    except Exception:
+        return ""
+
+
+def generate_picklist_pdf(
+    po_numbers: List[str],
+    items: List[Dict[str, Any]],
+    summary: Dict[str, Any],
+) -> bytes:
     if not items:
         raise HTTPException(status_code=400, detail="No picklist lines found for the given PO numbers")
 
-    try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.platypus import (
-            Image,
-            Paragraph,
-            SimpleDocTemplate,
-            Spacer,
-            Table,
-            TableStyle,
-        )
-    except (ImportError, ModuleNotFoundError) as exc:
-        raise HTTPException(status_code=500, detail="reportlab is required for PDF generation") from exc
+    if getSampleStyleSheet is None:
+        raise HTTPException(status_code=500, detail="reportlab is required for PDF generation")
 
     buffer = BytesIO()
     try:
@@ -160,51 +269,40 @@ def generate_picklist_pdf(po_numbers: List[str], items: List[Dict[str, Any]], su
             topMargin=15 * mm,
             bottomMargin=15 * mm,
         )
-        styles = getSampleStyleSheet()
-        normal = styles["Normal"]
-        normal.fontSize = 9
-        title_style = styles["Normal"]
-        title_style.fontSize = 9
-        qty_style = styles["Normal"]
-        qty_style.fontSize = 9
-        qty_style.alignment = 1  # center
-
-        data = []
-        header = ["ASIN", "SKU", "Image", "Title", "Total Qty"]
-        data.append(header)
+        normal = _PDF_NORMAL_STYLE
 
+        header = ["ASIN", "SKU", "Image", "Title", "Total Qty"]
         col_widths = [28 * mm, 28 * mm, 40 * mm, 64 * mm, 20 * mm]
 
-        for it in items:
-            asin = it.get("asin") or ""
-            sku = it.get("sku") or it.get("externalId") or it.get("vendorSku") or ""
-            img_url = it.get("image") or ""
-            title = it.get("title") or ""
-            qty = it.get("totalQty") or ""
+        image_blobs = _prefetch_images(it.get("image") or "" for it in items)
 
-            img_flow = ""
-            if img_url:
-                try:
-                    img_flow = Image(img_url, width=38 * mm, height=38 * mm, kind="proportional")
-                except Exception:
-                    img_flow = ""
-
-            data.append([asin, sku, img_flow, Paragraph(title, normal), qty])
+        data = [header]
+        data.extend(
+            [
+                it.get("asin") or "",
+                it.get("sku") or it.get("externalId") or it.get("vendorSku") or "",
+                _img_for(it.get("image") or "", image_blobs),
+                Paragraph(it.get("title") or "", normal),
+                it.get("totalQty") or "",
+            ]
+            for it in items
+        )
 
-        table = Table(data, colWidths=col_widths, repeatRows=1)
+        table = Table(data, colWidths=col_widths, repeatRows=1, splitByRow=1)
         table.setStyle(
             TableStyle(
                 [
                     ("BACKGROUND", (0, 0), (-1, 0), "#f0f0f0"),
                     ("GRID", (0, 0), (-1, -1), 0.5, "#cccccc"),
                     ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+                    ("ALIGN", (4, 0), (4, -1), "CENTER"),  # Total Qty
                     ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
                 ]
             )
         )
 
         elements = [
-            Paragraph(f"Picklist for POs: {', '.join(po_numbers)}", title_style),
+            Paragraph(f"Picklist for POs: {', '.join(po_numbers)}", normal),
             Spacer(1, 8),
             Paragraph(
                 f"Summary: {summary.get('numPos')} POs, {summary.get('totalLines')} SKUs, {summary.get('totalUnits')} units",
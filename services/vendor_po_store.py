@@ -1,17 +1,19 @@
+import functools
 import json
 import logging
 import sqlite3
 import time
+from contextlib import nullcontext
 from datetime import datetime, timezone
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 # DB-FIRST: SQLite is the single source of truth.
 # JSON files are debug/export only and must not be used for live state.
 
 from services import db as db_service
-from services.json_cache import DEFAULT_VENDOR_POS_CACHE, load_vendor_pos_cache
+from services.json_cache import DEFAULT_VENDOR_POS_CACHE, load_vendor_pos_cache, loads_json_bytes
 
 LOGGER = logging.getLogger(__name__)
 HEADER_TABLE = "vendor_po_header"
@@ -20,6 +22,128 @@ SYNC_TABLE = "vendor_po_sync_state"
 SCHEMA_ENSURED = False
 
 
+_LINE_COLUMNS = (
+    "po_number",
+    "item_sequence_number",
+    "asin",
+    "vendor_sku",
+    "barcode",
+    "title",
+    "image",
+    "ordered_qty",
+    "accepted_qty",
+    "received_qty",
+    "cancelled_qty",
+    "pending_qty",
+    "shortage_qty",
+    "net_cost_amount",
+    "net_cost_currency",
+    "list_price_amount",
+    "list_price_currency",
+    "last_updated_at",
+    "raw_json",
+    "ship_to_location",
+)
+# Built once at import; replace_vendor_po_lines reuses the same statement text for every PO.
+_LINE_DELETE_SQL = f"DELETE FROM {LINE_TABLE} WHERE po_number = ?"
+# Lines are inserted with multi-row INSERT ... VALUES (...), (...) so SQLite binds and runs
+# one statement per chunk instead of one per line. Chunks stay under the 999 bound-variable
+# limit of older SQLite builds.
+_LINE_ROWS_PER_INSERT = 999 // len(_LINE_COLUMNS)
+_LINE_INSERT_PREFIX = f"INSERT INTO {LINE_TABLE} ({', '.join(_LINE_COLUMNS)}) VALUES "
+_LINE_ROW_PLACEHOLDER = "(" + ", ".join("?" * len(_LINE_COLUMNS)) + ")"
+
+
+# Statements whose text depends only on a placeholder count are built once per arity.
+@functools.lru_cache(maxsize=64)
+def _line_insert_sql(row_count: int) -> str:
+    return _LINE_INSERT_PREFIX + ", ".join([_LINE_ROW_PLACEHOLDER] * row_count)
+
+
+@functools.lru_cache(maxsize=64)
+def _lines_for_pos_sql(n_params: int) -> str:
+    return f"""
+        SELECT *
+        FROM {LINE_TABLE}
+        WHERE po_number IN ({",".join("?" * n_params)})
+        ORDER BY po_number, item_sequence_number
+    """
+
+
+@functools.lru_cache(maxsize=64)
+def _line_totals_sql(n_params: int) -> str:
+    return f"""
+        SELECT
+            po_number,
+            COALESCE(SUM(ordered_qty), 0) AS requested_qty,
+            COALESCE(SUM(accepted_qty), 0) AS accepted_qty,
+            COALESCE(SUM(received_qty), 0) AS received_qty,
+            COALESCE(SUM(cancelled_qty), 0) AS cancelled_qty,
+            COALESCE(SUM(pending_qty), 0) AS pending_qty
+        FROM {LINE_TABLE}
+        WHERE po_number IN ({",".join("?" * n_params)})
+        GROUP BY po_number
+    """
+
+
+@functools.lru_cache(maxsize=64)
+def _rejected_lines_sql(n_params: int) -> str:
+    return f"""
+        SELECT po_number, asin, vendor_sku AS sku, ship_to_location, ordered_qty, cancelled_qty, accepted_qty
+        FROM {LINE_TABLE}
+        WHERE po_number IN ({",".join("?" * n_params)})
+          AND (
+              COALESCE(cancelled_qty, 0) > 0
+              OR COALESCE(accepted_qty, 0) < COALESCE(ordered_qty, 0)
+          )
+    """
+
+
+# vendor_po_lines DDL, shared by the migrations below and tools/debug scripts so they
+# cannot drift apart. LINE_SCHEMA_SQL is the whole fresh-database schema as one script.
+LINE_TABLE_DDL = f"""
+        CREATE TABLE IF NOT EXISTS {LINE_TABLE} (
+            po_number TEXT NOT NULL,
+            item_sequence_number TEXT NOT NULL,
+            asin TEXT,
+            vendor_sku TEXT,
+            barcode TEXT,
+            title TEXT,
+            image TEXT,
+            ordered_qty INTEGER DEFAULT 0,
+            accepted_qty INTEGER DEFAULT 0,
+            received_qty INTEGER DEFAULT 0,
+            cancelled_qty INTEGER DEFAULT 0,
+            pending_qty INTEGER DEFAULT 0,
+            shortage_qty INTEGER DEFAULT 0,
+            net_cost_amount REAL,
+            net_cost_currency TEXT,
+            list_price_amount REAL,
+            list_price_currency TEXT,
+            last_updated_at TEXT,
+            raw_json TEXT,
+            ship_to_location TEXT,
+            PRIMARY KEY (po_number, item_sequence_number)
+        )
+        """
+# Covering index for the per-PO quantity SUMs (aggregate_line_totals, debug/verify
+# scripts): they read only the index, never the wide rows with raw_json. Its
+# po_number prefix also serves plain po_number lookups, so the old
+# single-column index is redundant.
+_LINE_INDEX_DDL = (
+    f"""
+        CREATE INDEX IF NOT EXISTS idx_{LINE_TABLE}_po_totals ON {LINE_TABLE}(
+            po_number, ordered_qty, accepted_qty, cancelled_qty,
+            received_qty, pending_qty, shortage_qty
+        )
+        """,
+    f"DROP INDEX IF EXISTS idx_{LINE_TABLE}_po_number",
+    f"CREATE INDEX IF NOT EXISTS idx_{LINE_TABLE}_asin ON {LINE_TABLE}(asin)",
+    f"CREATE INDEX IF NOT EXISTS idx_{LINE_TABLE}_vendor_sku ON {LINE_TABLE}(vendor_sku)",
+)
+LINE_SCHEMA_SQL = ";\n".join((LINE_TABLE_DDL, *_LINE_INDEX_DDL)) + ";\n"
+
+
 def ensure_vendor_po_schema() -> None:
     """
     Ensure all vendor PO tables exist with required columns/indexes.
@@ -78,9 +202,8 @@ def _ensure_header_table(conn: sqlite3.Connection) -> None:
 def _ensure_line_table(conn: sqlite3.Connection) -> None:
     columns = _list_columns(conn, LINE_TABLE)
     if not columns:
-        _create_line_table(conn)
-        _ensure_line_indexes(conn)
-        conn.commit()
+        # Fresh database: table and indexes in one script (executescript commits itself).
+        conn.executescript(LINE_SCHEMA_SQL)
         return
 
     # If legacy schema (id column) exists, rebuild table to enforce PK on po_number/item_sequence_number
@@ -303,49 +426,22 @@ def upsert_vendor_po_headers(
     return {"upserted": len(upsert_rows)}
 
 
-def replace_vendor_po_lines(po_number: str, lines: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+def replace_vendor_po_lines(
+    po_number: str,
+    lines: Sequence[Dict[str, Any]],
+    *,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Dict[str, Any]:
     """
     Replace all line items for a PO inside the vendor_po_lines table.
+    With conn, runs inside the caller's open write transaction and leaves the commit to it.
     """
     ensure_vendor_po_schema()
     if not po_number:
         return {"lines": 0}
 
-    delete_sql = f"DELETE FROM {LINE_TABLE} WHERE po_number = ?"
-    db_service.execute_write(delete_sql, (po_number,))
-
-    if not lines:
-        return {"lines": 0}
-
-    insert_sql = f"""
-        INSERT INTO {LINE_TABLE} (
-            po_number,
-            item_sequence_number,
-            asin,
-            vendor_sku,
-            barcode,
-            title,
-            image,
-            ordered_qty,
-            accepted_qty,
-            received_qty,
-            cancelled_qty,
-            pending_qty,
-            shortage_qty,
-            net_cost_amount,
-            net_cost_currency,
-            list_price_amount,
-            list_price_currency,
-            last_updated_at,
-            raw_json,
-            ship_to_location
-        )
-        VALUES (
-            ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
-        )
-    """
     rows: List[Tuple[Any, ...]] = []
-    for line in lines:
+    for line in lines or []:
         rows.append(
             (
                 po_number,
@@ -371,18 +467,25 @@ def replace_vendor_po_lines(po_number: str, lines: Sequence[Dict[str, Any]]) ->
             )
         )
 
-    db_service.execute_many_write(insert_sql, rows)
+    # Delete + insert in one transaction: a single commit per PO, and readers never
+    # observe the PO with its old lines removed but the new ones not yet written.
+    with nullcontext(conn) if conn is not None else db_service.write_transaction() as tx:
+        tx.execute(_LINE_DELETE_SQL, (po_number,))
+        for start in range(0, len(rows), _LINE_ROWS_PER_INSERT):
+            chunk = rows[start : start + _LINE_ROWS_PER_INSERT]
+            tx.execute(_line_insert_sql(len(chunk)), [value for row in chunk for value in row])
     return {"lines": len(rows)}
 
 
 def get_vendor_po_list(
     *,
     created_after: Optional[str] = None,
-    order_desc: bool = True,
+    order_desc: Optional[bool] = True,
     limit: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
     """
     Return vendor PO headers hydrated with stored raw JSON payloads.
+    order_desc=None skips the ORDER BY (no sort) for callers that do not need ordering.
     """
     ensure_vendor_po_schema()
     clauses: List[str] = []
@@ -391,7 +494,10 @@ def get_vendor_po_list(
         clauses.append("order_date >= ?")
         params.append(created_after)
 
-    order_clause = "ORDER BY order_date DESC" if order_desc else "ORDER BY order_date ASC"
+    if order_desc is None:
+        order_clause = ""
+    else:
+        order_clause = "ORDER BY order_date DESC" if order_desc else "ORDER BY order_date ASC"
     limit_clause = ""
     if limit is not None and limit > 0:
         limit_clause = " LIMIT ?"
@@ -428,12 +534,16 @@ def get_vendor_po(po_number: str) -> Optional[Dict[str, Any]]:
     return _hydrate_po_row(row)
 
 
-def get_vendor_po_lines(po_number: str) -> List[Dict[str, Any]]:
+def iter_vendor_po_lines(po_number: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a PO's lines straight off the cursor, in item_sequence_number order.
+    The read connection stays open until the iterator is exhausted or closed.
+    """
     ensure_vendor_po_schema()
     if not po_number:
-        return []
+        return
     with db_service.get_db_connection() as conn:
-        rows = conn.execute(
+        cursor = conn.execute(
             f"""
             SELECT *
             FROM {LINE_TABLE}
@@ -441,34 +551,41 @@ def get_vendor_po_lines(po_number: str) -> List[Dict[str, Any]]:
             ORDER BY item_sequence_number
             """,
             (po_number,),
-        ).fetchall()
-    results: List[Dict[str, Any]] = []
-    for row in rows:
-        results.append(dict(row))
+        )
+        for row in cursor:
+            yield dict(row)
+
+
+def get_vendor_po_lines(po_number: str) -> List[Dict[str, Any]]:
+    return list(iter_vendor_po_lines(po_number))
+
+
+def get_vendor_po_lines_for_pos(po_numbers: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Batch form of get_vendor_po_lines: one query for many POs.
+    Returns po_number -> lines (same per-PO ordering); POs without lines are absent.
+    """
+    ensure_vendor_po_schema()
+    po_numbers = list(dict.fromkeys(po for po in po_numbers if po))
+    if not po_numbers:
+        return {}
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    with db_service.get_db_connection() as conn:
+        # Each PO lies wholly in one chunk, so per-PO line order survives the merge.
+        for row in db_service.select_in_chunks(conn, _lines_for_pos_sql, po_numbers):
+            results.setdefault(row["po_number"], []).append(dict(row))
     return results
 
 
 def aggregate_line_totals(po_numbers: Iterable[str]) -> Dict[str, Dict[str, int]]:
     ensure_vendor_po_schema()
-    po_numbers = [po for po in po_numbers if po]
+    # Deduplicated so each PO's GROUP BY row comes from exactly one chunk.
+    po_numbers = list(dict.fromkeys(po for po in po_numbers if po))
     if not po_numbers:
         return {}
-    placeholders = ",".join(["?"] * len(po_numbers))
-    sql = f"""
-        SELECT
-            po_number,
-            COALESCE(SUM(ordered_qty), 0) AS requested_qty,
-            COALESCE(SUM(accepted_qty), 0) AS accepted_qty,
-            COALESCE(SUM(received_qty), 0) AS received_qty,
-            COALESCE(SUM(cancelled_qty), 0) AS cancelled_qty,
-            COALESCE(SUM(pending_qty), 0) AS pending_qty
-        FROM {LINE_TABLE}
-        WHERE po_number IN ({placeholders})
-        GROUP BY po_number
-    """
     with db_service.get_db_connection() as conn:
-        rows = conn.execute(sql, tuple(po_numbers)).fetchall()
-    return {row["po_number"]: dict(row) for row in rows}
+        rows = db_service.select_in_chunks(conn, _line_totals_sql, po_numbers)
+        return {row["po_number"]: dict(row) for row in rows}
 
 
 def get_vendor_po_line_totals_for_po(po_number: str) -> Dict[str, int]:
@@ -476,6 +593,32 @@ def get_vendor_po_line_totals_for_po(po_number: str) -> Dict[str, int]:
     return totals.get(po_number, {})
 
 
+def get_vendor_po_lines_with_totals(po_number: str) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Read a PO's lines and sum their quantities in the same pass.
+    Totals match aggregate_line_totals for the PO and are {} when it has no lines.
+    """
+    lines: List[Dict[str, Any]] = []
+    requested = accepted = received = cancelled = pending = 0
+    for line in iter_vendor_po_lines(po_number):
+        lines.append(line)
+        requested += line["ordered_qty"] or 0
+        accepted += line["accepted_qty"] or 0
+        received += line["received_qty"] or 0
+        cancelled += line["cancelled_qty"] or 0
+        pending += line["pending_qty"] or 0
+    if not lines:
+        return lines, {}
+    return lines, {
+        "po_number": po_number,
+        "requested_qty": requested,
+        "accepted_qty": accepted,
+        "received_qty": received,
+        "cancelled_qty": cancelled,
+        "pending_qty": pending,
+    }
+
+
 def get_vendor_po_line_amount_total(po_number: str) -> Dict[str, Any]:
     """
     Sum accepted_qty * net_cost_amount for a PO using DB line data.
@@ -541,22 +684,13 @@ def count_vendor_po_headers() -> int:
 
 def get_rejected_vendor_po_lines(po_numbers: Sequence[str]) -> List[Dict[str, Any]]:
     ensure_vendor_po_schema()
-    po_numbers = [po for po in po_numbers if po]
+    # Deduplicated so a PO repeated across chunks cannot return its lines twice.
+    po_numbers = list(dict.fromkeys(po for po in po_numbers if po))
     if not po_numbers:
         return []
-    placeholders = ",".join(["?"] * len(po_numbers))
-    sql = f"""
-        SELECT po_number, asin, vendor_sku AS sku, ship_to_location, ordered_qty, cancelled_qty, accepted_qty
-        FROM {LINE_TABLE}
-        WHERE po_number IN ({placeholders})
-          AND (
-              COALESCE(cancelled_qty, 0) > 0
-              OR COALESCE(accepted_qty, 0) < COALESCE(ordered_qty, 0)
-          )
-    """
     with db_service.get_db_connection() as conn:
-        rows = conn.execute(sql, tuple(po_numbers)).fetchall()
-    return [dict(row) for row in rows]
+        rows = db_service.select_in_chunks(conn, _rejected_lines_sql, po_numbers)
+        return [dict(row) for row in rows]
 
 
 def get_vendor_po_ledger(po_number: str) -> List[Dict[str, Any]]:
@@ -632,7 +766,12 @@ def update_header_totals_from_lines(
     last_changed_at: Optional[str] = None,
     total_cost: Optional[float] = None,
     cost_currency: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> None:
+    """
+    Write line-derived totals onto the PO header.
+    With conn, runs inside the caller's open write transaction and leaves the commit to it.
+    """
     ensure_vendor_po_schema()
     if not po_number:
         return
@@ -668,7 +807,10 @@ def update_header_totals_from_lines(
         cost_currency,
         po_number,
     )
-    db_service.execute_write(sql, params)
+    if conn is not None:
+        conn.execute(sql, params)
+    else:
+        db_service.execute_write(sql, params)
 
 
 
@@ -679,9 +821,11 @@ def update_header_raw_payload(
     source: str,
     source_detail: Optional[str] = None,
     synced_at: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> None:
     """
     Update stored raw JSON payload without overwriting totals.
+    With conn, runs inside the caller's open write transaction and leaves the commit to it.
     """
     ensure_vendor_po_schema()
     if not po_number:
@@ -723,7 +867,10 @@ def update_header_raw_payload(
         amazon_status,
         po_number,
     )
-    db_service.execute_write(sql, params)
+    if conn is not None:
+        conn.execute(sql, params)
+    else:
+        db_service.execute_write(sql, params)
 
 
 def get_vendor_pos_by_numbers(po_numbers: Sequence[str]) -> List[Dict[str, Any]]:
@@ -785,7 +932,7 @@ def _hydrate_po_row(row: sqlite3.Row) -> Dict[str, Any]:
     payload_raw = row["raw_json"]
     if payload_raw:
         try:
-            po = json.loads(payload_raw)
+            po = loads_json_bytes(payload_raw)
         except Exception:
             po = {"purchaseOrderNumber": row["po_number"]}
     else:
@@ -883,33 +1030,7 @@ def _prepare_header_row(
 
 
 def _create_line_table(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        f"""
-        CREATE TABLE IF NOT EXISTS {LINE_TABLE} (
-            po_number TEXT NOT NULL,
-            item_sequence_number TEXT NOT NULL,
-            asin TEXT,
-            vendor_sku TEXT,
-            barcode TEXT,
-            title TEXT,
-            image TEXT,
-            ordered_qty INTEGER DEFAULT 0,
-            accepted_qty INTEGER DEFAULT 0,
-            received_qty INTEGER DEFAULT 0,
-            cancelled_qty INTEGER DEFAULT 0,
-            pending_qty INTEGER DEFAULT 0,
-            shortage_qty INTEGER DEFAULT 0,
-            net_cost_amount REAL,
-            net_cost_currency TEXT,
-            list_price_amount REAL,
-            list_price_currency TEXT,
-            last_updated_at TEXT,
-            raw_json TEXT,
-            ship_to_location TEXT,
-            PRIMARY KEY (po_number, item_sequence_number)
-        )
-        """
-    )
+    conn.execute(LINE_TABLE_DDL)
 
 
 def _rebuild_vendor_po_lines(conn: sqlite3.Connection) -> None:
@@ -995,15 +1116,9 @@ def _rebuild_vendor_po_lines(conn: sqlite3.Connection) -> None:
 
 
 def _ensure_line_indexes(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        f"CREATE INDEX IF NOT EXISTS idx_{LINE_TABLE}_po_number ON {LINE_TABLE}(po_number)"
-    )
-    conn.execute(
-        f"CREATE INDEX IF NOT EXISTS idx_{LINE_TABLE}_asin ON {LINE_TABLE}(asin)"
-    )
-    conn.execute(
-        f"CREATE INDEX IF NOT EXISTS idx_{LINE_TABLE}_vendor_sku ON {LINE_TABLE}(vendor_sku)"
-    )
+    # Statement by statement (not executescript) so callers' open transactions stay open.
+    for ddl in _LINE_INDEX_DDL:
+        conn.execute(ddl)
 
 
 def _list_columns(conn: sqlite3.Connection, table: str) -> Dict[str, sqlite3.Row]:
@@ -1035,6 +1150,13 @@ def _normalize_pos_entries(data: Any) -> List[Dict[str, Any]]:
     elif isinstance(data, list):
         items_raw = data
 
+    # Caches written by the current app already hold bare PO dicts; hand the list
+    # back as-is instead of rebuilding it entry by entry.
+    if isinstance(items_raw, list) and all(
+        type(entry) is dict and "raw" not in entry for entry in items_raw
+    ):
+        return items_raw
+
     normalized: List[Dict[str, Any]] = []
     for entry in items_raw:
         if isinstance(entry, dict) and "raw" in entry and isinstance(entry["raw"], dict):
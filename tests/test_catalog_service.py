@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from services import db as db_service
+from services.catalog_service import (
+    init_catalog_db,
+    spapi_catalog_status,
+    spapi_catalog_status_for,
+    update_catalog_barcode,
+    upsert_spapi_catalog,
+)
+
+
+def _payload(title: str, image: str, sku: str = "SKU-1") -> dict:
+    return {
+        "summaries": [{"itemName": title}],
+        "images": [{"variants": [{"link": image}]}],
+        "vendorDetails": [{"vendorSKU": sku}],
+    }
+
+
+def _setup_tmp_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "catalog.db"
+    monkeypatch.setattr(db_service, "CATALOG_DB_PATH", db_path)
+    init_catalog_db(db_path)
+    return db_path
+
+
+def test_upsert_spapi_catalog_updates_in_place(tmp_path, monkeypatch):
+    db_path = _setup_tmp_db(tmp_path, monkeypatch)
+    upsert_spapi_catalog("B000TEST01", _payload("Old title", "http://img/old.jpg"), db_path)
+    assert update_catalog_barcode("B000TEST01", "1234567890123", db_path)
+
+    with db_service.get_db_connection() as conn:
+        rowid_before = conn.execute(
+            "SELECT rowid FROM spapi_catalog WHERE asin = ?", ("B000TEST01",)
+        ).fetchone()[0]
+
+    upsert_spapi_catalog("B000TEST01", _payload("New title", "http://img/new.jpg", "SKU-2"), db_path)
+
+    with db_service.get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT rowid, title, image, barcode FROM spapi_catalog WHERE asin = ?",
+            ("B000TEST01",),
+        ).fetchone()
+    assert row["rowid"] == rowid_before
+    assert row["title"] == "New title"
+    assert row["image"] == "http://img/new.jpg"
+    # Barcode is not part of the upsert payload and must survive a catalog refresh.
+    assert row["barcode"] == "1234567890123"
+
+    status = spapi_catalog_status(db_path)
+    assert status["B000TEST01"]["sku"] == "SKU-2"
+
+
+def test_spapi_catalog_status_for_limits_to_requested_asins(tmp_path, monkeypatch):
+    db_path = _setup_tmp_db(tmp_path, monkeypatch)
+    upsert_spapi_catalog("B000TEST01", _payload("One", "http://img/1.jpg"), db_path)
+    upsert_spapi_catalog("B000TEST02", _payload("Two", "http://img/2.jpg"), db_path)
+
+    subset = spapi_catalog_status_for(["B000TEST02", "B000MISSING", ""], db_path)
+    assert set(subset) == {"B000TEST02"}
+    assert subset["B000TEST02"] == spapi_catalog_status(db_path)["B000TEST02"]
+    assert spapi_catalog_status_for([], db_path) == {}
+
+
+def test_spapi_catalog_status_reads_payload_only_for_incomplete_rows(tmp_path, monkeypatch):
+    db_path = _setup_tmp_db(tmp_path, monkeypatch)
+    upsert_spapi_catalog("B000TEST01", _payload("Complete", "http://img/1.jpg"), db_path)
+    upsert_spapi_catalog("B000TEST02", _payload("Needs backfill", "http://img/2.jpg"), db_path)
+    with db_service.get_db_connection() as conn:
+        conn.execute("UPDATE spapi_catalog SET title = NULL WHERE asin = ?", ("B000TEST02",))
+        conn.commit()
+
+    status = spapi_catalog_status(db_path)
+    assert status["B000TEST01"]["title"] == "Complete"
+    assert status["B000TEST01"]["payload"] is None
+    assert status["B000TEST02"]["title"] == "Needs backfill"
+    assert status["B000TEST02"]["payload"]["summaries"][0]["itemName"] == "Needs backfill"
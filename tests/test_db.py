@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from services import db as db_service
+
+
+def _autocheckpoint() -> int:
+    with db_service.get_db_connection() as conn:
+        return conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0]
+
+
+def test_deferred_wal_checkpoint_only_affects_the_bulk_context(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_service, "CATALOG_DB_PATH", tmp_path / "catalog.db")
+    other_thread: list = []
+
+    with db_service.deferred_wal_checkpoint(pages=5000):
+        assert _autocheckpoint() == 5000
+        # Worker threads started by the bulk job (asyncio.to_thread) inherit the override...
+        assert asyncio.run(asyncio.to_thread(_autocheckpoint)) == 5000
+        # ...but connections opened by unrelated threads (e.g. requests) keep the default.
+        thread = threading.Thread(target=lambda: other_thread.append(_autocheckpoint()))
+        thread.start()
+        thread.join()
+
+    assert other_thread == [1000]
+    assert _autocheckpoint() == 1000
+
+
+def test_select_in_chunks_splits_long_in_lists(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_service, "CATALOG_DB_PATH", tmp_path / "catalog.db")
+    monkeypatch.setattr(db_service, "IN_CHUNK_SIZE", 2)
+    statements: list = []
+
+    def _sql(n: int) -> str:
+        statements.append(n)
+        return f"SELECT value FROM json_each('[1,2,3,4,5]') WHERE value IN ({','.join('?' * n)})"
+
+    with db_service.get_db_connection() as conn:
+        rows = db_service.select_in_chunks(conn, _sql, [5, 1, 4, 9, 3])
+        assert [row[0] for row in rows] == [1, 5, 4, 3]
+
+    assert statements == [2, 2, 1]
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+
+from services import json_cache
+
+
+def test_load_reuses_parsed_json_until_file_changes(tmp_path):
+    path = tmp_path / "oos_state.json"
+    path.write_text(json.dumps({"A": {"asin": "A"}}), encoding="utf-8")
+
+    first = json_cache.load_oos_state(path)
+    assert json_cache.load_oos_state(path) is first
+
+    # An external writer (another process / manual edit) must invalidate the entry.
+    path.write_text(json.dumps({"B": {"asin": "B"}, "C": {}}), encoding="utf-8")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert set(json_cache.load_oos_state(path)) == {"B", "C"}
+
+
+def test_save_updates_cache_in_process(tmp_path):
+    path = tmp_path / "po_tracker.json"
+    json_cache.save_po_tracker({"PO-1": {"status": "open"}}, path)
+    assert json_cache.load_po_tracker(path) == {"PO-1": {"status": "open"}}
+
+    path.unlink()
+    assert json_cache.load_po_tracker(path) == {}
+
+
+def test_json_snapshot_sidecar_tracks_source_file(tmp_path):
+    path = tmp_path / "vendor_pos_cache.json"
+    path.write_text(json.dumps({"items": [{"purchaseOrderNumber": "PO1"}]}), encoding="utf-8")
+    assert json_cache.read_json_snapshot(path) is None
+
+    assert json_cache.load_json_snapshot(path) == {"items": [{"purchaseOrderNumber": "PO1"}]}
+    assert (tmp_path / "vendor_pos_cache.json.pkl").exists()
+    assert json_cache.read_json_snapshot(path) == {"items": [{"purchaseOrderNumber": "PO1"}]}
+
+    path.write_text(json.dumps({"items": []}), encoding="utf-8")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert json_cache.read_json_snapshot(path) is None
+    assert json_cache.load_json_snapshot(path) == {"items": []}
+
+
+def test_read_json_file_parses_memory_mapped_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_cache, "_MMAP_MIN_BYTES", 0)
+    path = tmp_path / "vendor_pos_cache.json"
+    path.write_text(json.dumps({"items": [{"purchaseOrderNumber": "PO1"}]}), encoding="utf-8")
+    assert json_cache.read_json_file(path) == {"items": [{"purchaseOrderNumber": "PO1"}]}
+
+    # Non-standard literals that orjson rejects still parse via the stdlib fallback.
+    path.write_text('{"qty": NaN}', encoding="utf-8")
+    assert math.isnan(json_cache.read_json_file(path)["qty"])
+
+
+def test_cached_loaders_never_memory_map(tmp_path, monkeypatch):
+    # Server-side reads race with in-place rewrites; an mmap'd parse would SIGBUS.
+    monkeypatch.setattr(json_cache, "_MMAP_MIN_BYTES", 0)
+
+    def fail_mmap(*args, **kwargs):
+        raise AssertionError("server reads must not mmap")
+
+    monkeypatch.setattr(json_cache.mmap, "mmap", fail_mmap)
+    path = tmp_path / "oos_state.json"
+    path.write_text(json.dumps({"A": {"asin": "A"}}), encoding="utf-8")
+    assert json_cache.load_oos_state(path) == {"A": {"asin": "A"}}
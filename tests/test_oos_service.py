@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from services import oos_service
+
+
+def _patch_state(monkeypatch, state: dict) -> list:
+    saved: list = []
+    monkeypatch.setattr(oos_service.json_cache, "load_oos_state", lambda: state)
+    monkeypatch.setattr(oos_service.json_cache, "save_oos_state", lambda s: saved.append(dict(s)))
+    return saved
+
+
+def test_seed_from_rejected_lines_skips_existing_keys(monkeypatch):
+    existing = {"poNumber": "PO-1", "asin": "A1", "qty": 99, "isOutOfStock": False}
+    state = {"PO-1::A1": existing}
+    saved = _patch_state(monkeypatch, state)
+    rejected = [
+        {
+            "po_number": "PO-1",
+            "asin": asin,
+            "ordered_qty": qty,
+            "cancelled_qty": qty,
+            "accepted_qty": 0,
+        }
+        for asin, qty in (("A1", 5), ("A2", 3))
+    ]
+    monkeypatch.setattr(oos_service, "get_rejected_vendor_po_lines", lambda pos: rejected)
+
+    assert oos_service.seed_oos_from_rejected_lines(["PO-1"]) == 1
+    assert state["PO-1::A1"] is existing
+    assert existing == {"poNumber": "PO-1", "asin": "A1", "qty": 99, "isOutOfStock": False}
+    assert state["PO-1::A2"]["qty"] == 3
+    assert len(saved) == 1
+
+    # Every rejected line already seeded: nothing is counted and the state is not rewritten.
+    assert oos_service.seed_oos_from_rejected_lines(["PO-1"]) == 0
+    assert len(saved) == 1
+
+
+def test_seed_from_rejected_payload_skips_existing_keys(monkeypatch):
+    existing = {"poNumber": "PO-9", "asin": "B1", "qty": 42, "isOutOfStock": False}
+    state = {"PO-9::B1": existing}
+    saved = _patch_state(monkeypatch, state)
+
+    def _item(asin: str, qty: int) -> dict:
+        return {
+            "amazonProductIdentifier": asin,
+            "orderedQuantity": {"amount": qty},
+            "acknowledgementStatus": {"confirmationStatus": "REJECTED"},
+        }
+
+    purchase_orders = [
+        {
+            "purchaseOrderNumber": "PO-9",
+            "orderDetails": {"items": [_item("B1", 7), _item("B2", 2)]},
+        }
+    ]
+
+    assert oos_service.seed_oos_from_rejected_payload(purchase_orders) == 1
+    assert state["PO-9::B1"] is existing
+    assert existing == {"poNumber": "PO-9", "asin": "B1", "qty": 42, "isOutOfStock": False}
+    assert state["PO-9::B2"]["qty"] == 2.0
+    assert len(saved) == 1
+
+    assert oos_service.seed_oos_from_rejected_payload(purchase_orders) == 0
+    assert len(saved) == 1
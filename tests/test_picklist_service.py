@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image as PILImage
+
+from services import picklist_service
+from services.picklist_service import consolidate_picklist, generate_picklist_pdf
+
+
+def _item(asin: str, sku: str, ordered: float, accepted=None) -> dict:
+    item = {
+        "amazonProductIdentifier": asin,
+        "vendorProductIdentifier": sku,
+        "orderedQuantity": {"amount": ordered},
+    }
+    if accepted is not None:
+        item["acknowledgementStatus"] = {"acceptedQuantity": {"amount": accepted}}
+    return item
+
+
+def _po(po_number: str, *items: dict) -> dict:
+    return {"purchaseOrderNumber": po_number, "orderDetails": {"items": list(items)}}
+
+
+def _consolidate(po_numbers, po_records, catalog=None, rejected_rows=None):
+    catalog = catalog or {}
+    requested: list = []
+
+    def catalog_status_for(asins):
+        requested.append(list(asins))
+        return {asin: catalog[asin] for asin in asins if asin in catalog}
+
+    result = consolidate_picklist(
+        po_numbers,
+        po_records,
+        load_oos_state_fn=lambda: {},
+        save_oos_state_fn=lambda state: None,
+        spapi_catalog_status_fn=catalog_status_for,
+        upsert_oos_entry_fn=lambda *a, **kw: None,
+        fetch_rejected_lines_fn=lambda pos: rejected_rows or [],
+    )
+    result["catalog_requests"] = requested
+    return result
+
+
+def test_consolidate_picklist_sums_accepted_qty_and_skips_rejected():
+    records = [
+        _po("PO1", _item("A1", "S1", 5, accepted=3), _item("A2", "S2", 4), _item("A3", "S3", 2)),
+        _po("PO2", _item("A1", "S1", 2), _item("A2", "S2", 1, accepted=0)),
+        _po("PO3", _item("A9", "S9", 50)),
+    ]
+    rejected = [{"po_number": "PO1", "asin": "A3", "accepted_qty": 0, "ordered_qty": 2}]
+    catalog = {"A1": {"title": "Widget", "image": "http://img/a1.jpg", "sku": "MASTER-1"}}
+
+    result = _consolidate(["PO1", "PO2"], records, catalog, rejected)
+
+    items = {item["asin"]: item for item in result["items"]}
+    assert set(items) == {"A1", "A2"}
+    assert items["A1"]["totalQty"] == 5
+    assert items["A1"]["sku"] == "MASTER-1"
+    assert items["A1"]["title"] == "Widget"
+    # acceptedQuantity of 0 falls back to the ordered quantity.
+    assert items["A2"]["totalQty"] == 5
+    assert items["A2"]["sku"] == "S2"
+    assert result["summary"] == {"numPos": 2, "totalUnits": 10, "totalLines": 2, "warning": None}
+    # Catalog info is requested once, for the ASINs on the selected POs only.
+    assert result["catalog_requests"] == [["A1", "A2", "A3"]]
+
+
+def test_consolidate_picklist_orders_by_total_qty_desc():
+    records = [_po("PO1", _item("A1", "S1", 1), _item("A2", "S2", 7), _item("A3", "S3", 3))]
+
+    result = _consolidate(["PO1"], records)
+
+    assert [item["asin"] for item in result["items"]] == ["A2", "A3", "A1"]
+
+
+def test_consolidate_picklist_without_matching_pos():
+    result = _consolidate(["PO-X"], [_po("PO1", _item("A1", "S1", 1))])
+    assert result["items"] == []
+    assert result["summary"]["warning"] == "No matching POs"
+
+
+def test_generate_picklist_pdf_prefetches_each_image_once(monkeypatch):
+    png = BytesIO()
+    PILImage.new("RGB", (40, 60), "red").save(png, "PNG")
+    fetched = []
+
+    def fake_fetch(url):
+        fetched.append(url)
+        if "missing" in url:
+            raise RuntimeError("404")
+        return png.getvalue()
+
+    monkeypatch.setattr(picklist_service, "_fetch_image_bytes", fake_fetch)
+    items = [
+        {"asin": "A1", "sku": "S1", "image": "https://img/a.png", "title": "One", "totalQty": 3},
+        {"asin": "A2", "sku": "S2", "image": "https://img/a.png", "title": "Two", "totalQty": 2},
+        {"asin": "A3", "sku": "S3", "image": "https://img/missing.png", "totalQty": 1},
+        {"asin": "A4", "sku": "S4", "totalQty": 1},
+    ]
+
+    pdf = generate_picklist_pdf(["PO1"], items, {"numPos": 1, "totalLines": 4, "totalUnits": 7})
+
+    assert pdf.startswith(b"%PDF-")
+    assert sorted(fetched) == ["https://img/a.png", "https://img/missing.png"]
+
+
+def test_image_cache_is_bounded_by_total_bytes(monkeypatch):
+    monkeypatch.setattr(picklist_service, "_IMAGE_CACHE", OrderedDict())
+    monkeypatch.setattr(picklist_service, "_IMAGE_CACHE_BYTES", 0)
+    monkeypatch.setattr(picklist_service, "_IMAGE_CACHE_MAX_BYTES", 250)
+    downloads = []
+
+    class _Response:
+        def __init__(self, url):
+            self.content = url[-1].encode() * 100
+
+        def raise_for_status(self):
+            pass
+
+    def fake_get(url, timeout):
+        downloads.append(url)
+        return _Response(url)
+
+    monkeypatch.setattr(picklist_service.requests, "get", fake_get)
+    fetch = picklist_service._fetch_image_bytes
+
+    fetch("https://img/a")
+    fetch("https://img/b")
+    fetch("https://img/a")  # cache hit; "b" is now least recently used
+    fetch("https://img/c")  # 300 bytes > 250: evicts "b"
+    assert downloads == ["https://img/a", "https://img/b", "https://img/c"]
+    assert list(picklist_service._IMAGE_CACHE) == ["https://img/a", "https://img/c"]
+    assert picklist_service._IMAGE_CACHE_BYTES == 200
+
+    fetch("https://img/b")
+    assert downloads[-1] == "https://img/b"
@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+import sqlite3
 from datetime import datetime, timezone
 
+import pytest
+
 from services import db as db_service
 from services import vendor_po_store as store_module
 from services.vendor_po_lock import acquire_vendor_po_lock, release_vendor_po_lock
 from services.vendor_po_store import (
+    aggregate_line_totals,
     ensure_vendor_po_schema,
     export_vendor_pos_snapshot,
+    get_vendor_po_lines,
+    get_vendor_po_lines_for_pos,
+    get_vendor_po_lines_with_totals,
     get_vendor_po_list,
+    iter_vendor_po_lines,
     replace_vendor_po_lines,
     update_header_totals_from_lines,
     upsert_vendor_po_headers,
@@ -152,3 +160,156 @@ def test_export_snapshot_lists_raw_json(tmp_path, monkeypatch):
     snapshot = export_vendor_pos_snapshot()
     assert snapshot["items"]
     assert snapshot["items"][0]["purchaseOrderNumber"] == "PO-EXP"
+
+
+def test_get_vendor_po_lines_for_pos_matches_single_po_reads(tmp_path, monkeypatch):
+    _setup_tmp_db(tmp_path, monkeypatch)
+    headers = [_sample_po("PO-A"), _sample_po("PO-B"), _sample_po("PO-C")]
+    upsert_vendor_po_headers(headers, source="test", source_detail="batch")
+
+    def _line(seq: str, asin: str) -> dict:
+        return {
+            "item_sequence_number": seq,
+            "asin": asin,
+            "vendor_sku": f"SKU-{asin}",
+            "ordered_qty": 1,
+        }
+
+    replace_vendor_po_lines("PO-A", [_line("2", "A2"), _line("1", "A1")])
+    replace_vendor_po_lines("PO-B", [_line("1", "B1")])
+
+    batched = get_vendor_po_lines_for_pos(["PO-A", "PO-B", "PO-C", "PO-A", ""])
+
+    assert set(batched) == {"PO-A", "PO-B"}
+    assert batched["PO-A"] == get_vendor_po_lines("PO-A")
+    assert [line["asin"] for line in batched["PO-A"]] == ["A1", "A2"]
+    assert batched["PO-B"] == get_vendor_po_lines("PO-B")
+    assert get_vendor_po_lines_for_pos([]) == {}
+
+    # Lists longer than one IN chunk are split and merged.
+    monkeypatch.setattr(db_service, "IN_CHUNK_SIZE", 1)
+    assert get_vendor_po_lines_for_pos(["PO-A", "PO-MISSING", "PO-B"]) == batched
+
+
+def test_iter_vendor_po_lines_streams_rows_in_sequence_order(tmp_path, monkeypatch):
+    _setup_tmp_db(tmp_path, monkeypatch)
+    upsert_vendor_po_headers([_sample_po("PO-ITER")], source="test", source_detail="iter")
+    replace_vendor_po_lines(
+        "PO-ITER",
+        [
+            {"item_sequence_number": "2", "asin": "I2", "ordered_qty": 2},
+            {"item_sequence_number": "1", "asin": "I1", "ordered_qty": 1},
+        ],
+    )
+
+    rows = iter_vendor_po_lines("PO-ITER")
+    first = next(rows)
+    assert isinstance(first, dict)
+    assert first["asin"] == "I1"
+    assert [line["asin"] for line in rows] == ["I2"]
+
+    assert get_vendor_po_lines("PO-ITER") == list(iter_vendor_po_lines("PO-ITER"))
+    assert list(iter_vendor_po_lines("PO-MISSING")) == []
+    assert list(iter_vendor_po_lines("")) == []
+
+
+def test_lines_with_totals_match_the_sql_aggregate(tmp_path, monkeypatch):
+    _setup_tmp_db(tmp_path, monkeypatch)
+    upsert_vendor_po_headers([_sample_po("PO-SUM")], source="test", source_detail="sum")
+    replace_vendor_po_lines(
+        "PO-SUM",
+        [
+            {
+                "item_sequence_number": "1",
+                "asin": "S1",
+                "ordered_qty": 10,
+                "accepted_qty": 8,
+                "received_qty": 3,
+                "cancelled_qty": 2,
+                "pending_qty": 5,
+            },
+            {"item_sequence_number": "2", "asin": "S2", "ordered_qty": 4, "accepted_qty": 4},
+        ],
+    )
+
+    lines, totals = get_vendor_po_lines_with_totals("PO-SUM")
+
+    assert lines == get_vendor_po_lines("PO-SUM")
+    assert totals == aggregate_line_totals(["PO-SUM"])["PO-SUM"]
+    assert totals["requested_qty"] == 14
+    assert get_vendor_po_lines_with_totals("PO-MISSING") == ([], {})
+
+
+def test_replace_vendor_po_lines_is_atomic(tmp_path, monkeypatch):
+    _setup_tmp_db(tmp_path, monkeypatch)
+    upsert_vendor_po_headers([_sample_po("PO-ATOMIC")], source="test", source_detail="atomic")
+    replace_vendor_po_lines(
+        "PO-ATOMIC", [{"item_sequence_number": "1", "asin": "OLD1", "ordered_qty": 2}]
+    )
+
+    # Duplicate (po_number, item_sequence_number) fails mid-insert; the delete must roll back.
+    duplicate = {"item_sequence_number": "1", "asin": "NEW1", "ordered_qty": 1}
+    with pytest.raises(sqlite3.IntegrityError):
+        replace_vendor_po_lines("PO-ATOMIC", [duplicate, dict(duplicate)])
+
+    assert [line["asin"] for line in get_vendor_po_lines("PO-ATOMIC")] == ["OLD1"]
+
+    assert replace_vendor_po_lines("PO-ATOMIC", []) == {"lines": 0}
+    assert get_vendor_po_lines("PO-ATOMIC") == []
+
+
+def test_replace_vendor_po_lines_spans_multiple_insert_chunks(tmp_path, monkeypatch):
+    _setup_tmp_db(tmp_path, monkeypatch)
+    upsert_vendor_po_headers([_sample_po("PO-BIG")], source="test", source_detail="chunks")
+    lines = [
+        {"item_sequence_number": f"{i:03d}", "asin": f"A{i}", "ordered_qty": i}
+        for i in range(1, 121)
+    ]
+
+    assert replace_vendor_po_lines("PO-BIG", lines) == {"lines": 120}
+
+    stored = get_vendor_po_lines("PO-BIG")
+    assert [line["asin"] for line in stored] == [f"A{i}" for i in range(1, 121)]
+    assert sum(line["ordered_qty"] for line in stored) == sum(range(1, 121))
+
+
+def test_line_and_header_writes_share_caller_transaction(tmp_path, monkeypatch):
+    _setup_tmp_db(tmp_path, monkeypatch)
+    upsert_vendor_po_headers([_sample_po("PO-TX")], source="test", source_detail="tx")
+    line = {"item_sequence_number": "1", "asin": "A1"}
+
+    with pytest.raises(RuntimeError):
+        with db_service.write_transaction() as conn:
+            replace_vendor_po_lines("PO-TX", [line], conn=conn)
+            update_header_totals_from_lines("PO-TX", {"requested_qty": 7}, conn=conn)
+            raise RuntimeError("sync aborted")
+
+    assert get_vendor_po_lines("PO-TX") == []
+    assert store_get_vendor_po("PO-TX")["requestedQty"] != 7
+
+    with db_service.write_transaction() as conn:
+        replace_vendor_po_lines("PO-TX", [line], conn=conn)
+        update_header_totals_from_lines("PO-TX", {"requested_qty": 7}, conn=conn)
+
+    assert [line["asin"] for line in get_vendor_po_lines("PO-TX")] == ["A1"]
+    assert store_get_vendor_po("PO-TX")["requestedQty"] == 7
+
+
+def test_schema_migration_replaces_legacy_po_number_index(tmp_path, monkeypatch):
+    db_path = tmp_path / "catalog.db"
+    monkeypatch.setattr(db_service, "CATALOG_DB_PATH", db_path)
+    monkeypatch.setattr(store_module, "SCHEMA_ENSURED", False, raising=False)
+    # Pre-covering-index layout: current columns plus the old single-column po_number index.
+    legacy = sqlite3.connect(db_path)
+    legacy.executescript(
+        store_module.LINE_TABLE_DDL
+        + ";\nCREATE INDEX idx_vendor_po_lines_po_number ON vendor_po_lines(po_number);\n"
+    )
+    legacy.close()
+
+    ensure_vendor_po_schema()
+
+    with db_service.get_db_connection() as conn:
+        indexes = {row["name"] for row in conn.execute("PRAGMA index_list(vendor_po_lines)")}
+    assert "idx_vendor_po_lines_po_number" not in indexes
+    assert "idx_vendor_po_lines_po_totals" in indexes
@@ -67,6 +67,7 @@ def test_po_details_hydrates_lines_from_db(monkeypatch):
 
     monkeypatch.setattr(main, "store_get_vendor_po", fake_get_po)
     monkeypatch.setattr(main, "store_get_vendor_po_lines", fake_get_lines)
+    monkeypatch.setattr(main, "get_vendor_po_lines_with_totals", lambda po: (fake_get_lines(po), {}))
     monkeypatch.setattr(main, "bootstrap_headers_from_cache", lambda: None)
     monkeypatch.setattr(main, "load_po_tracker", lambda: {})
     monkeypatch.setattr(main, "get_po_notification_flags", lambda _: {})
@@ -146,6 +147,7 @@ def test_po_details_amounts_and_rejected(monkeypatch):
 
     monkeypatch.setattr(main, "store_get_vendor_po", fake_get_po)
     monkeypatch.setattr(main, "store_get_vendor_po_lines", fake_get_lines)
+    monkeypatch.setattr(main, "get_vendor_po_lines_with_totals", lambda po: (fake_get_lines(po), {}))
     monkeypatch.setattr(main, "bootstrap_headers_from_cache", lambda: None)
     monkeypatch.setattr(main, "load_po_tracker", lambda: {})
     monkeypatch.setattr(main, "get_po_notification_flags", lambda _: {})
@@ -1,8 +1,8 @@
-import json
 import logging
 from pathlib import Path
 
 from main import harvest_barcodes_from_pos, normalize_pos_entries
+from services.json_cache import read_json_file
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("backfill_barcodes")
@@ -17,7 +17,7 @@ def backfill():
         return {"processed_pos": 0, "processed_lines": 0, "barcodes_set": 0, "barcodes_skipped_invalid": 0}
 
     try:
-        data = json.loads(VENDOR_POS_CACHE.read_text(encoding="utf-8"))
+        data = read_json_file(VENDOR_POS_CACHE)
     except Exception as exc:
         logger.error(f"Failed to read vendor_pos_cache.json: {exc}")
         return {"processed_pos": 0, "processed_lines": 0, "barcodes_set": 0, "barcodes_skipped_invalid": 0}
@@ -38,7 +38,15 @@ def find_catalog_db() -> str:
 def backup_db(db_path: str) -> str:
     ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_path = f"{db_path}.backup_before_forecast_cleanup_{ts}"
-    shutil.copy2(db_path, backup_path)
+    # SQLite online backup: a consistent snapshot that includes pages still in
+    # the -wal file, which a plain file copy of catalog.db would miss.
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(backup_path)
+    try:
+        src.backup(dst, pages=1024)
+    finally:
+        dst.close()
+        src.close()
     return backup_path
 
 
@@ -67,6 +75,21 @@ def drop_forecast_tables(db_path: str):
     return dropped
 
 
+def compact_db(db_path: str):
+    """VACUUM + ANALYZE so pages freed by the dropped tables are returned to the OS."""
+    size_before = os.path.getsize(db_path)
+    # VACUUM cannot run inside a transaction, so use a fresh autocommit connection.
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("VACUUM")
+        conn.execute("ANALYZE")
+        # In WAL mode the rewritten pages land in the -wal file first.
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return size_before, os.path.getsize(db_path)
+
+
 def archive_files(base_dir: str):
     archive_dir = os.path.join(base_dir, "archive")
     os.makedirs(archive_dir, exist_ok=True)
@@ -119,6 +142,17 @@ def main():
         print(f"  - {t}: {status}")
     print()
 
+    if dropped:
+        try:
+            size_before, size_after = compact_db(db_path)
+            print(
+                f"[INFO] VACUUM/ANALYZE complete: {size_before / 1e6:.1f} MB -> "
+                f"{size_after / 1e6:.1f} MB"
+            )
+        except sqlite3.Error as e:
+            print(f"[WARN] VACUUM/ANALYZE failed: {e}")
+        print()
+
     if args.archive_files:
         moved = archive_files(base_dir)
         if moved:
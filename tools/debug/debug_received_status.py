@@ -1,38 +1,49 @@
 #!/usr/bin/env python3
 """Manual debug script to inspect vendor_po_lines for a PO; not part of the main app."""
 import sqlite3
+from contextlib import closing
 from pathlib import Path
 
 db_path = Path("C:\\spapi_desktop_app\\catalog.db")
 
+PO_NUMBER = "6RD2BEAD"
+
 if db_path.exists():
-    with sqlite3.connect(db_path) as conn:
+    # Read-only: never takes write locks or touches the journal of the live DB.
+    with closing(sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)) as conn:
+        conn.execute("PRAGMA query_only=1")
+        conn.row_factory = sqlite3.Row
+        # Totals are summed by SQLite in one row; every summed column is in
+        # idx_vendor_po_lines_po_totals, so this reads only the index.
+        total_lines, total_ordered, total_accepted, total_received = conn.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(ordered_qty), 0), COALESCE(SUM(accepted_qty), 0),
+                   COALESCE(SUM(received_qty), 0)
+            FROM vendor_po_lines
+            WHERE po_number = ?
+            """,
+            (PO_NUMBER,),
+        ).fetchone()
+        print(f"Found {total_lines} lines for PO {PO_NUMBER}\n")
+
         cursor = conn.execute("""
-            SELECT po_number, asin, sku, ordered_qty, acknowledged_qty, cancelled_qty, 
-                   shipped_qty, received_qty, shortage_qty, pending_qty
+            SELECT asin, ordered_qty, accepted_qty, received_qty, shortage_qty
             FROM vendor_po_lines
-            WHERE po_number = '6RD2BEAD'
+            WHERE po_number = ?
             ORDER BY asin
-        """)
-        
-        rows = cursor.fetchall()
-        print(f"Found {len(rows)} lines for PO 6RD2BEAD\n")
-        
-        total_ordered = 0
-        total_received = 0
-        total_shipped = 0
+        """, (PO_NUMBER,))
         
-        for row in rows:
-            po, asin, sku, ordered, ack, canc, shipped, received, shortage, pending = row
-            print(f"ASIN: {asin:15s} | Ordered: {ordered:4d} | Received: {received:4d} | Shipped: {shipped:4d} | Shortage: {shortage:4d}")
-            total_ordered += ordered
-            total_received += received
-            total_shipped += shipped
+        for row in cursor:
+            print(
+                f"ASIN: {row['asin']:15s} | Ordered: {row['ordered_qty']:4d} | "
+                f"Accepted: {row['accepted_qty']:4d} | Received: {row['received_qty']:4d} | "
+                f"Shortage: {row['shortage_qty']:4d}"
+            )
         
         print("\nTotals:")
         print(f"  Total Ordered:  {total_ordered}")
+        print(f"  Total Accepted: {total_accepted}")
         print(f"  Total Received: {total_received}")
-        print(f"  Total Shipped:  {total_shipped}")
         print("\nExpected (from Amazon dashboard):")
         print("  Ordered: 975")
         print("  Received: 40")
@@ -12,6 +12,12 @@ def migrate_vendor_po_lines_schema():
         return
     
     conn = sqlite3.connect(str(DB_PATH))
+    conn.isolation_level = None  # manual transaction control
+    # Same journal mode as the app; larger cache and in-memory temp for the table copy.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-200000")
     cursor = conn.cursor()
     
     try:
@@ -28,6 +34,9 @@ def migrate_vendor_po_lines_schema():
         if 'acknowledged_qty' in columns and 'accepted_qty' not in columns:
             print("[Migration] Found old schema with acknowledged_qty. Migrating...")
             
+            # Rename/create/copy/drop as one transaction so WAL commits once
+            cursor.execute("BEGIN IMMEDIATE")
+
             # Rename old table
             cursor.execute("ALTER TABLE vendor_po_lines RENAME TO vendor_po_lines_old")
             print("[Migration] Renamed old table to vendor_po_lines_old")
@@ -68,7 +77,7 @@ def migrate_vendor_po_lines_schema():
             cursor.execute("DROP TABLE vendor_po_lines_old")
             print("[Migration] Dropped old table")
             
-            conn.commit()
+            cursor.execute("COMMIT")
             print("[Migration] ✓ Migration completed successfully")
         
         elif 'accepted_qty' in columns:
@@ -79,7 +88,8 @@ def migrate_vendor_po_lines_schema():
     
     except Exception as e:
         print(f"[Migration] ERROR: {e}")
-        conn.rollback()
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
         raise
     
     finally:
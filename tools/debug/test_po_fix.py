@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """Manual debug script to inspect vendor_po_lines aggregation; not part of the main app."""
 
+import itertools
 import sqlite3
+from contextlib import closing
 from pathlib import Path
 
 CATALOG_DB_PATH = Path(__file__).resolve().parents[2] / "catalog.db"
@@ -11,7 +13,11 @@ def test_po_lines():
         print(f"[ERROR] Database not found: {CATALOG_DB_PATH}")
         return
     
-    with sqlite3.connect(CATALOG_DB_PATH) as conn:
+    # Read-only: never takes write locks or touches the journal of the live DB.
+    db_uri = f"{CATALOG_DB_PATH.resolve().as_uri()}?mode=ro"
+    with closing(sqlite3.connect(db_uri, uri=True)) as conn:
+        conn.execute("PRAGMA query_only=1")
+        conn.row_factory = sqlite3.Row
         # Check table exists
         cursor = conn.execute(
             "SELECT name FROM sqlite_master WHERE type='table' AND name='vendor_po_lines'"
@@ -35,8 +41,8 @@ def test_po_lines():
             ORDER BY MAX(last_changed_utc) DESC
         """)
         
-        rows = cursor.fetchall()
-        if not rows:
+        first = cursor.fetchone()
+        if first is None:
             print("[INFO] No PO lines found in database")
             return
         
@@ -46,14 +52,14 @@ def test_po_lines():
         
         total_pos = 0
         total_lines = 0
-        for row in rows:
-            po_num = row[0]
-            line_count = row[1]
-            ordered = row[2]
-            received = row[3]
-            shortage = row[4]
-            pending = row[5]
-            last_change = row[6]
+        for row in itertools.chain((first,), cursor):
+            po_num = row["po_number"]
+            line_count = row["line_count"]
+            ordered = row["total_ordered"]
+            received = row["total_received"]
+            shortage = row["total_shortage"]
+            pending = row["total_pending"]
+            last_change = row["last_change"]
             
             print(f"{po_num:<15} {line_count:<8} {ordered:<10} {received:<10} {shortage:<10} {pending:<10} {last_change:<20}")
             total_pos += 1
@@ -1,46 +1,48 @@
 #!/usr/bin/env python3
 """Manual debug script for PO data sync verification; not part of the main app."""
 import sys
+from pathlib import Path
 
-sys.path.insert(0, '/spapi_desktop_app')
+# Run as `python tools/debug/test_po_fixes.py`: make the repo's packages importable.
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from services.db import get_db_connection_for_path
+from services.json_cache import load_json_snapshot
+from services.vendor_po_store import LINE_SCHEMA_SQL, LINE_TABLE
+
+
+def _qty(value):
+    """SP-API quantity ({"amount": n} or a bare number) as int; anything else is 0."""
+    t = type(value)
+    if t is dict:
+        return int(value.get("amount", 0) or 0)
+    if t is int or t is float:
+        return int(value)
+    return 0
 
-import json
-import sqlite3
-from pathlib import Path
 
 # Initialize DB
 print("=== Initializing Database ===")
-db_path = Path("catalog.db")
-conn = sqlite3.connect(str(db_path))
-cursor = conn.cursor()
-
-# Create table
-sql = """
-CREATE TABLE IF NOT EXISTS vendor_po_lines (
-    id INTEGER PRIMARY KEY,
-    po_number TEXT NOT NULL,
-    ship_to_location TEXT,
-    asin TEXT,
-    sku TEXT,
-    ordered_qty INTEGER DEFAULT 0,
-    acknowledged_qty INTEGER DEFAULT 0,
-    cancelled_qty INTEGER DEFAULT 0,
-    shipped_qty INTEGER DEFAULT 0,
-    received_qty INTEGER DEFAULT 0,
-    shortage_qty INTEGER DEFAULT 0,
-    pending_qty INTEGER DEFAULT 0,
-    last_changed_utc TEXT
-)
-"""
-cursor.execute(sql)
-conn.commit()
-print("✓ vendor_po_lines table ready")
+db_path = REPO_ROOT / "catalog.db"
+with get_db_connection_for_path(db_path) as conn:
+    # Only a missing table is created here (app schema: table + indexes, in one script). An
+    # existing table -- possibly a legacy layout -- is left alone; the app migrates it in
+    # services.vendor_po_store.ensure_vendor_po_schema().
+    columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({LINE_TABLE})")}
+    if not columns:
+        conn.executescript(LINE_SCHEMA_SQL)
+        print("✓ vendor_po_lines table created")
+    elif {"item_sequence_number", "accepted_qty"} <= columns:
+        print("✓ vendor_po_lines table ready")
+    else:
+        print("! vendor_po_lines has a legacy layout; start the app once to migrate it")
 
 # Test: Parse a sample PO from cache
 print("\n=== Testing PO Data Parsing ===")
-cache_file = Path("vendor_pos_cache.json")
+cache_file = REPO_ROOT / "vendor_pos_cache.json"
 if cache_file.exists():
-    data = json.loads(cache_file.read_text())
+    data = load_json_snapshot(cache_file)
     pos = data.get("items", [])
     
     if pos:
@@ -62,20 +64,14 @@ if cache_file.exists():
             print(f"    - SKU: {first_item.get('vendorProductIdentifier')}")
             
             oq = first_item.get('orderedQuantity')
-            if isinstance(oq, dict):
+            if type(oq) is dict:
                 qty = oq.get('amount')
                 print(f"    - Ordered Qty (parsed from dict): {qty}")
             else:
                 print(f"    - Ordered Qty (unexpected type): {type(oq)} = {oq}")
             
             # FIX TEST: correct parsing
-            if isinstance(oq, dict):
-                correct_qty = int(oq.get("amount", 0) or 0)
-            elif isinstance(oq, (int, float)):
-                correct_qty = int(oq)
-            else:
-                correct_qty = 0
-            print(f"    - FIX: Correct parsed qty: {correct_qty}")
+            print(f"    - FIX: Correct parsed qty: {_qty(oq)}")
         
         # Test itemStatus parsing
         item_status_list = po.get("itemStatus", [])
@@ -86,19 +82,8 @@ if cache_file.exists():
             print(f"    - itemSequenceNumber: {first_status.get('itemSequenceNumber')}")
             print(f"    - statusCode: {first_status.get('statusCode')}")
             
-            ack_qty = first_status.get('acknowledgedQuantity')
-            if isinstance(ack_qty, dict):
-                ack = ack_qty.get('amount', 0)
-            else:
-                ack = ack_qty
-            print(f"    - acknowledgedQuantity: {ack}")
-            
-            recv_qty = first_status.get('receivedQuantity')
-            if isinstance(recv_qty, dict):
-                recv = recv_qty.get('amount', 0)
-            else:
-                recv = recv_qty
-            print(f"    - receivedQuantity: {recv}")
+            print(f"    - acknowledgedQuantity: {_qty(first_status.get('acknowledgedQuantity'))}")
+            print(f"    - receivedQuantity: {_qty(first_status.get('receivedQuantity'))}")
 
 # FIX VALIDATION
 print("\n=== Fix Validation ===")
@@ -110,5 +95,4 @@ print("1. Call fetch_detailed_po_with_status(po_number) to get itemStatus")
 print("2. Use _sync_vendor_po_lines_for_po() to parse and store data")
 print("3. Call sync_vendor_po_lines_batch() after fetching new POs")
 
-conn.close()
 print("\n✓ All checks passed!")
@@ -1,21 +1,43 @@
 """Manual debug script for verifying PO status totals; not part of the main app."""
 
-import json
-from typing import Dict, List
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 from main import VENDOR_POS_CACHE, fetch_po_status_totals
-from services.db import get_db_connection
+from services.db import get_db_connection, select_in_chunks
+from services.json_cache import load_json_snapshot, read_json_snapshot
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None  # type: ignore[assignment]
 
 
 def load_po_numbers() -> List[str]:
     if not VENDOR_POS_CACHE.exists():
         print("vendor_pos_cache.json not found; nothing to verify")
         return []
-    try:
-        data = json.loads(VENDOR_POS_CACHE.read_text(encoding="utf-8"))
-    except Exception as e:
-        print(f"Failed to read vendor_pos_cache.json: {e}")
-        return []
+    data = read_json_snapshot(VENDOR_POS_CACHE)
+    if data is None and ijson is not None:
+        # Only items[*].purchaseOrderNumber is needed: stream it instead of building the DOM.
+        try:
+            with VENDOR_POS_CACHE.open("rb") as f:
+                po_numbers = [
+                    po for po in ijson.items(f, "items.item.purchaseOrderNumber") if po
+                ]
+        except Exception as e:
+            print(f"Failed to read vendor_pos_cache.json: {e}")
+            return []
+        if not po_numbers:
+            print("vendor_pos_cache.json has no items[].purchaseOrderNumber entries")
+        return po_numbers
+    if data is None:
+        try:
+            data = load_json_snapshot(VENDOR_POS_CACHE)
+        except Exception as e:
+            print(f"Failed to read vendor_pos_cache.json: {e}")
+            return []
     items = data.get("items") if isinstance(data, dict) else None
     if not isinstance(items, list):
         print("vendor_pos_cache.json missing items array")
@@ -27,28 +49,56 @@ def load_po_numbers() -> List[str]:
     return po_numbers
 
 
-def get_db_totals(po_number: str) -> Dict[str, int]:
-    sql = """
-    SELECT
+_TOTALS_COLUMNS = """
         COALESCE(SUM(ordered_qty), 0) AS ordered,
         COALESCE(SUM(accepted_qty), 0) AS accepted,
         COALESCE(SUM(cancelled_qty), 0) AS cancelled,
         COALESCE(SUM(received_qty), 0) AS received,
         COALESCE(SUM(pending_qty), 0) AS pending,
         COALESCE(SUM(shortage_qty), 0) AS shortage
+"""
+_EMPTY_TOTALS = {"ordered": 0, "accepted": 0, "cancelled": 0, "received": 0, "pending": 0, "shortage": 0}
+# Same concurrency as the app's PO line sync; purchaseOrdersStatus is rate limited and a
+# throttled call reports zero totals, which would show up here as false mismatches.
+_STATUS_FETCH_WORKERS = 4
+
+
+def _totals_sql(n_params: int) -> str:
+    return f"""
+    SELECT po_number, {_TOTALS_COLUMNS}
     FROM vendor_po_lines
-    WHERE po_number = ?
+    WHERE po_number IN ({",".join("?" * n_params)})
+    GROUP BY po_number
     """
+
+
+def get_db_totals(po_number: str) -> Dict[str, int]:
+    return get_db_totals_bulk([po_number]).get(po_number, dict(_EMPTY_TOTALS))
+
+
+def get_db_totals_bulk(po_numbers: List[str]) -> Dict[str, Dict[str, int]]:
+    """Line totals for many POs: one GROUP BY query per chunk instead of one query per PO."""
+    totals: Dict[str, Dict[str, int]] = {}
     with get_db_connection() as conn:
-        row = conn.execute(sql, (po_number,)).fetchone()
-        if not row:
-            return {"ordered": 0, "accepted": 0, "cancelled": 0, "received": 0, "pending": 0, "shortage": 0}
-        return {k: row[k] for k in row.keys()}
+        # Columns come back in _TOTALS_COLUMNS order; unpack positionally rather than by name.
+        for po, ordered, accepted, cancelled, received, pending, shortage in select_in_chunks(
+            conn, _totals_sql, po_numbers
+        ):
+            totals[po] = {
+                "ordered": ordered,
+                "accepted": accepted,
+                "cancelled": cancelled,
+                "received": received,
+                "pending": pending,
+                "shortage": shortage,
+            }
+    return totals
 
 
-def verify_po(po_number: str) -> Dict[str, str]:
+def verify_po(po_number: str, db_totals: Optional[Dict[str, int]] = None) -> Dict[str, str]:
     api_totals = fetch_po_status_totals(po_number)
-    db_totals = get_db_totals(po_number)
+    if db_totals is None:
+        db_totals = get_db_totals(po_number)
 
     mismatches = []
     api_received = api_totals.get("total_received_qty", 0)
@@ -67,16 +117,23 @@ def main():
     po_numbers = load_po_numbers()
     if not po_numbers:
         return
-    results = []
-    for po in po_numbers:
+    db_totals = get_db_totals_bulk(po_numbers)
+
+    def _verify_safe(po: str) -> Dict[str, str]:
         try:
-            results.append(verify_po(po))
+            return verify_po(po, db_totals.get(po, _EMPTY_TOTALS))
         except Exception as e:
-            results.append({"po": po, "status": f"error: {e}"})
+            return {"po": po, "status": f"error: {e}"}
+
+    # The per-PO status calls are network-bound; overlap them (map keeps input order).
+    with ThreadPoolExecutor(max_workers=_STATUS_FETCH_WORKERS) as pool:
+        results = list(pool.map(_verify_safe, po_numbers))
     failures = [r for r in results if r["status"] != "OK"]
-    for r in results:
-        print(f"{r['po']}: {r['status']}")
-    print("\nSummary: {} OK, {} mismatches".format(len(results) - len(failures), len(failures)))
+    # Build the whole report and write it once instead of one print() per PO.
+    out = [f"{r['po']}: {r['status']}" for r in results]
+    out.append("")
+    out.append(f"Summary: {len(results) - len(failures)} OK, {len(failures)} mismatches")
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 if __name__ == "__main__":